@@ -9,7 +9,8 @@ from config.financial_year import (
 
 def financial_year(request):
     """Expose current FY (in TIME_ZONE) to all templates."""
-    today = timezone.localdate()
+    # Reuse the date a report view already read (reports.views._today) so header and ETag agree
+    today = getattr(request, "_today", None) or timezone.localdate()
     start = financial_year_start(today)
     _, end = financial_year_bounds(today)
     return {
@@ -18,7 +18,7 @@ class Command(BaseCommand):
     help = "Diagnose closing stock variance: duplicate voucher candidates and per-item breakdown."
 
     def handle(self, *args, **options):
-        from ledger.services.stock_valuation import closing_stock_value
+        from ledger.services.stock_valuation import _ITEM_AGGREGATES, _item_value, closing_stock_value
 
         businesses = list(Business.objects.all())
         if not businesses:
@@ -77,36 +77,19 @@ class Command(BaseCommand):
             )
             if godown is not None:
                 entries = entries.filter(godown=godown)
-            item_ids = list(set(entries.values_list("item_id", flat=True)))
+            # One GROUP BY item_id query (each item once), then item names in one in_bulk()
+            item_rows = list(entries.order_by().values("item_id").annotate(**_ITEM_AGGREGATES))
+            items = Item.objects.in_bulk([row["item_id"] for row in item_rows])
             self.stdout.write("  Per-item (qty_in, cost_in, closing_qty, value):")
-            for item_id in item_ids:
-                item_entries = entries.filter(item_id=item_id)
-                qty_in_sum = (
-                    item_entries.aggregate(s=Sum("qty_in", default=Decimal("0")))["s"]
-                    or Decimal("0")
-                )
-                qty_out_sum = (
-                    item_entries.aggregate(s=Sum("qty_out", default=Decimal("0")))["s"]
-                    or Decimal("0")
-                )
-                closing_qty = qty_in_sum - qty_out_sum
+            for row in item_rows:
+                qty_in_sum = row["qty_in_sum"] or Decimal("0")
+                closing_qty = qty_in_sum - (row["qty_out_sum"] or Decimal("0"))
                 if closing_qty <= 0:
                     continue
-                in_entries = item_entries.filter(qty_in__gt=0)
-                cost_in = (
-                    in_entries.aggregate(s=Sum("amount", default=Decimal("0")))["s"]
-                    or Decimal("0")
-                )
-                qty_in_total = (
-                    in_entries.aggregate(s=Sum("qty_in", default=Decimal("0")))["s"]
-                    or Decimal("0")
-                )
-                avg_rate = (
-                    (cost_in / qty_in_total) if qty_in_total and qty_in_total > 0 else Decimal("0")
-                )
-                value = (closing_qty * avg_rate).quantize(Decimal("0.01"))
-                item = Item.objects.filter(pk=item_id).first()
-                name = item.name if item else f"id={item_id}"
+                cost_in = row["cost_in"] or Decimal("0")
+                value = _item_value(row)
+                item = items.get(row["item_id"])
+                name = item.name if item else f"id={row['item_id']}"
                 self.stdout.write(
                     f"    {name}: qty_in={qty_in_sum} cost_in={cost_in} "
                     f"closing_qty={closing_qty} value={value}"
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0010_backfill_opening_stock_seeds"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="stockledgerentry",
+            index=models.Index(
+                fields=["business", "is_posted", "posting_date", "item"],
+                name="inv_sle_biz_posted_date_item",
+            ),
+        ),
+    ]
@@ -129,6 +129,13 @@ class StockLedgerEntry(models.Model):
     class Meta:
         ordering = ["-posting_date", "-id"]
         verbose_name_plural = "Stock ledger entries"
+        indexes = [
+            # Stock valuation: business + is_posted + posting_date <= cut-off, grouped by item
+            models.Index(
+                fields=["business", "is_posted", "posting_date", "item"],
+                name="inv_sle_biz_posted_date_item",
+            ),
+        ]
 
 
 class StockMovement(models.Model):
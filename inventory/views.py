@@ -3,7 +3,7 @@ from collections import defaultdict
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
@@ -27,8 +27,12 @@ def _get_business_or_redirect(request):
     bid = request.session.get("current_business_id")
     if not bid:
         return None, HttpResponseRedirect(reverse("org:select_business"))
-    from org.models import Business
-    return get_object_or_404(Business, id=bid), None
+    # Request-memoized lookup shared with the ledger views
+    from ledger.utils import get_active_business
+    business = get_active_business(request)
+    if business is None:
+        raise Http404("No Business matches the given query.")
+    return business, None
 
 
 def _standard_rate_formsets(request, item):
@@ -1297,9 +1301,15 @@ def _entry_amount(qty_in, qty_out, rate):
 
 
 def _next_voucher_number(business):
-    from ledger.models import Voucher
-    n = Voucher.objects.filter(business=business).count() + 1
-    return str(n)
+    """Reserve the next voucher number (call inside transaction.atomic())."""
+    from ledger.models import BusinessVoucherSequence
+    return BusinessVoucherSequence.allocate(business)
+
+
+def _peek_voucher_number(business):
+    """Number to show on a blank voucher form; not reserved."""
+    from ledger.models import BusinessVoucherSequence
+    return BusinessVoucherSequence.peek(business)
 
 
 def _item_standard_cost_rates(business):
@@ -1428,7 +1438,7 @@ def purchase_voucher_create(request):
             except Exception as e:
                 messages.error(request, f"Could not save: {e}")
 
-    voucher_number = _next_voucher_number(business) if request.method != "POST" else None
+    voucher_number = _peek_voucher_number(business) if request.method != "POST" else None
     if total_qty is None and request.method == "POST":
         total_qty, total_amount = _purchase_totals_from_formset(row_formset)
     # Latest standard cost per item (for rate auto-fill when item is selected)
@@ -58,6 +58,8 @@ class AccountForm(forms.ModelForm):
         # For groups: include roots so you can put a new group "Under" Assets/Liabilities/etc.
         # For ledgers: exclude roots so "Under" lists only non-root groups (e.g. Capital Account)
         include_root_groups = kwargs.pop("include_root_groups", False)
+        # Ledger screens: always behaves_like_subledger (is_group=False), whatever was posted
+        self.force_subledger = kwargs.pop("force_subledger", False)
         super().__init__(*args, **kwargs)
         if business:
             qs = Account.objects.filter(business=business, is_group=True).order_by("name")
@@ -88,7 +90,9 @@ class AccountForm(forms.ModelForm):
             self.fields["is_primary"].initial = False
 
         # Set behaves_like_subledger based on is_group (inverted)
-        if self.instance and self.instance.pk:
+        if self.force_subledger:
+            self.fields["behaves_like_subledger"].initial = True
+        elif self.instance and self.instance.pk:
             self.fields["behaves_like_subledger"].initial = not self.instance.is_group
         else:
             self.fields["behaves_like_subledger"].initial = False
@@ -100,6 +104,8 @@ class AccountForm(forms.ModelForm):
         root_type = cleaned_data.get("root_type")
 
         # Handle behaves_like_subledger (inverted is_group)
+        if self.force_subledger:
+            cleaned_data["behaves_like_subledger"] = True
         behaves_like_subledger = cleaned_data.get("behaves_like_subledger", False)
         cleaned_data["is_group"] = not behaves_like_subledger
 
@@ -9,6 +9,8 @@ from .models import Account, Voucher
 class VoucherEntryHeaderForm(forms.ModelForm):
     # Top "Account" (Cash/Bank). This is NOT a voucher line yet.
     account = forms.ModelChoiceField(queryset=Account.objects.none())
+    # CONTRA only: "deposit" (default) or "withdraw" radio on the entry screen
+    contra_direction = forms.CharField(required=False)
 
     class Meta:
         model = Voucher
@@ -20,6 +22,7 @@ class VoucherEntryHeaderForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         business = kwargs.pop("business", None)
+        self.vtype = kwargs.pop("vtype", None)
         super().__init__(*args, **kwargs)
         if business:
             # Must be a ledger account (not group)
@@ -29,6 +32,16 @@ class VoucherEntryHeaderForm(forms.ModelForm):
             ).order_by("name")
         self.fields["account"].widget.attrs.update({"class": "w-full border rounded px-3 py-2"})
 
+    def clean(self):
+        cleaned_data = super().clean()
+        # Receipt-style: top account Dr, particulars Cr (RECEIPT, SALES, CONTRA deposit).
+        # Payment-style otherwise (PAYMENT, PURCHASE, CONTRA withdraw).
+        contra_withdraw = cleaned_data.get("contra_direction") == "withdraw"
+        cleaned_data["receipt_style"] = self.vtype in ("RECEIPT", "SALES") or (
+            self.vtype == "CONTRA" and not contra_withdraw
+        )
+        return cleaned_data
+
 
 class ParticularLineForm(forms.Form):
     account = forms.ModelChoiceField(queryset=Account.objects.none())
@@ -0,0 +1,52 @@
+"""
+Check stored LedgerAggregate totals (plus the lines above each watermark) against the posted
+voucher lines and rebuild any ledger that drifted, e.g. after raw SQL or queryset.update().
+Run: python manage.py reconcile_ledger_aggregates [--dry-run] [--business ID]
+"""
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ledger.models import Account, LedgerAggregate
+
+
+class Command(BaseCommand):
+    help = "Compare stored per-ledger posted totals with a live SUM and correct mismatches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report mismatches.")
+        parser.add_argument("--business", type=int, default=None, help="Business ID (default: all).")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        bid = options["business"]
+        from org.models import Business
+        businesses = Business.objects.filter(pk=bid) if bid else Business.objects.all()
+
+        for business in businesses:
+            with transaction.atomic():
+                # Same lock as post/build/discard: nothing changes the rows while they are compared
+                LedgerAggregate._lock(business)
+                stored_ids = list(LedgerAggregate.objects.filter(business=business).values_list("account_id", flat=True))
+                if not stored_ids:
+                    continue
+                effective = LedgerAggregate._stored_with_tail(business, stored_ids)
+                live = LedgerAggregate.posted_totals(business, stored_ids)
+                zero = (Decimal("0.00"), Decimal("0.00"))
+                names = dict(Account.objects.filter(id__in=stored_ids).values_list("id", "name"))
+                mismatched = []
+                for aid in stored_ids:
+                    dr, cr = live.get(aid, zero)
+                    if effective[aid] != (dr, cr):
+                        self.stdout.write(
+                            f"Business {business.id} ledger {names.get(aid, aid)}: stored Dr {effective[aid][0]} "
+                            f"Cr {effective[aid][1]}, posted Dr {dr} Cr {cr}"
+                        )
+                        mismatched.append(aid)
+                if mismatched and not dry_run:
+                    # Rebuilt from scratch at the current watermark
+                    LedgerAggregate.objects.filter(business=business, account_id__in=mismatched).delete()
+                    LedgerAggregate._build(business, mismatched)
+                    self.stdout.write(self.style.SUCCESS(f"  Fixed {len(mismatched)} ledger(s)."))
+            self.stdout.write(f"Business {business.id}: {len(stored_ids)} stored ledger(s), {len(mismatched)} mismatch(es).")
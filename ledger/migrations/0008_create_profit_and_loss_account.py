@@ -5,19 +5,28 @@ from django.db import migrations
 
 def create_profit_and_loss_account(apps, schema_editor):
     Account = apps.get_model("ledger", "Account")
-    business_ids = Account.objects.values_list("business_id", flat=True).distinct()
-    for business_id in business_ids:
-        Account.objects.get_or_create(
-            business_id=business_id,
-            name="Profit & Loss A/c",
-            defaults={
-                "parent_id": None,
-                "is_group": False,
-                "is_primary_ledger": True,
-                "account_type": "",
-                "report_type": "PL",
-            },
-        )
+    name = "Profit & Loss A/c"
+    business_ids = set(Account.objects.values_list("business_id", flat=True).distinct())
+    existing = set(
+        Account.objects.filter(name=name, business_id__in=business_ids).values_list("business_id", flat=True)
+    )
+    # One bulk INSERT; uniq_account_name_per_business guards against races
+    Account.objects.bulk_create(
+        [
+            Account(
+                business_id=business_id,
+                name=name,
+                parent_id=None,
+                is_group=False,
+                is_primary_ledger=True,
+                account_type="",
+                report_type="PL",
+            )
+            for business_id in sorted(business_ids - existing)
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
 
 
 def noop(apps, schema_editor):
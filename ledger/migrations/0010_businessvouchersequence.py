@@ -0,0 +1,23 @@
+# Per-business voucher number sequence (replaces count()+1 numbering)
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0009_account_voucher_updated_at'),
+        ('org', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessVoucherSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_number', models.PositiveIntegerField(default=1)),
+                ('business', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='voucher_sequence', to='org.business')),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Stored posted Dr/Cr totals per ledger (built lazily, bumped on post)
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0010_businessvouchersequence'),
+        ('org', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_dr', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('total_cr', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('account', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='aggregate', to='ledger.account')),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_aggregates', to='org.business')),
+            ],
+        ),
+    ]
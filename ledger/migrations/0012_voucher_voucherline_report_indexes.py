@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ledger", "0011_ledgeraggregate"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="voucher",
+            index=models.Index(
+                fields=["business", "is_posted", "posting_date"],
+                name="ldg_vch_biz_posted_date",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="voucherline",
+            index=models.Index(fields=["account", "voucher"], name="ldg_vl_account_voucher"),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ledger", "0012_voucher_voucherline_report_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="voucher",
+            index=models.Index(fields=["business", "-posting_date", "-id"], name="ldg_vch_biz_date_desc"),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Watermark for LedgerAggregate: rows hold lines up to last_line_id, reads add the rest live
+
+from django.db import migrations, models
+
+
+def drop_aggregates(apps, schema_editor):
+    # Existing rows have no watermark; they are rebuilt on the next balance read
+    apps.get_model("ledger", "LedgerAggregate").objects.all().delete()
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ledger", "0013_voucher_newest_first_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ledgeraggregate",
+            name="last_line_id",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(drop_aggregates, noop),
+    ]
@@ -4,7 +4,7 @@ from decimal import Decimal
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
-from django.db.models import Q, Sum
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
 from django.utils import timezone
 from org.models import Business
 from mode_engine.models import ModeChoices
@@ -72,6 +72,7 @@ class Account(models.Model):
     sales_tax_no = models.CharField(max_length=50, blank=True, default="")
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         constraints = [
@@ -159,11 +160,18 @@ class Voucher(models.Model):
     business_source = models.ForeignKey("self", null=True, blank=True, on_delete=models.SET_NULL)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["business", "number"], name="uniq_voucher_number_per_business"),
         ]
+        indexes = [
+            # Ledger reports: posted vouchers of a business, optionally in a posting_date range
+            models.Index(fields=["business", "is_posted", "posting_date"], name="ldg_vch_biz_posted_date"),
+            # Newest-first voucher list (all statuses): index order matches ORDER BY, so LIMIT stops early
+            models.Index(fields=["business", "-posting_date", "-id"], name="ldg_vch_biz_date_desc"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.voucher_type} {self.number}"
@@ -183,23 +191,33 @@ class Voucher(models.Model):
         return (agg["dr"] or Decimal("0.00"), agg["cr"] or Decimal("0.00"))
 
     def validate_balanced(self):
+        # Line count, totals and group-posting check in a single aggregate query
+        agg = self.lines.aggregate(
+            n=Count("id"),
+            dr=Sum("debit", default=Decimal("0.00")),
+            cr=Sum("credit", default=Decimal("0.00")),
+            bad=Count("id", filter=Q(account__is_group=True)),
+        )
+
         # Must have at least 2 lines
-        if self.lines.count() < 2:
+        if agg["n"] < 2:
             raise ValidationError("Voucher must have at least two lines.")
 
-        dr, cr = self._totals()
+        dr = agg["dr"] or Decimal("0.00")
+        cr = agg["cr"] or Decimal("0.00")
         if dr != cr:
             raise ValidationError(f"Voucher not balanced: Debit {dr} != Credit {cr}")
 
         # No posting to groups
-        bad = self.lines.filter(account__is_group=True).exists()
-        if bad:
+        if agg["bad"]:
             raise ValidationError("Cannot post to a Group. Post only to Ledger accounts (is_group=False).")
 
-    @transaction.atomic
+    @transaction.atomic(savepoint=False)
     def post(self, user=None):
         """
         Tally-like 'Submit': enforce rules, then lock.
+        Callers that post inside their own atomic() block (voucher entry, purchase/sales) get no
+        extra savepoint: a failure here rolls back their whole block, which is what they want.
         """
         if self.is_posted:
             return  # idempotent
@@ -210,6 +228,7 @@ class Voucher(models.Model):
         self.posted_at = timezone.now()
         self.posted_by = user
         self.save()
+        LedgerAggregate.apply_voucher(self)
 
 
 class VoucherLine(models.Model):
@@ -234,6 +253,10 @@ class VoucherLine(models.Model):
                 name="chk_debit_credit_non_negative",
             ),
         ]
+        indexes = [
+            # Balance reads: one ledger's lines, joined to their vouchers without a table lookup
+            models.Index(fields=["account", "voucher"], name="ldg_vl_account_voucher"),
+        ]
 
     def clean(self):
         if self.voucher_id and self.voucher.is_posted:
@@ -248,3 +271,191 @@ class VoucherLine(models.Model):
     def save(self, *args, **kwargs):
         self.full_clean()
         return super().save(*args, **kwargs)
+
+
+class BusinessVoucherSequence(models.Model):
+    """
+    Next voucher number per business. Allocation locks this one row (SELECT ... FOR UPDATE)
+    instead of counting the business's vouchers, so concurrent posts get distinct numbers.
+    """
+    business = models.OneToOneField(Business, on_delete=models.CASCADE, related_name="voucher_sequence")
+    next_number = models.PositiveIntegerField(default=1)
+
+    def __str__(self) -> str:
+        return f"{self.business} next #{self.next_number}"
+
+    @staticmethod
+    def _initial_number(business) -> int:
+        """First number for a business without a sequence row: after its existing vouchers."""
+        numbers = Voucher.objects.filter(business=business).values_list("number", flat=True)
+        highest = max((int(n) for n in numbers if n.isdigit()), default=0)
+        return max(highest, len(numbers)) + 1
+
+    @classmethod
+    def peek(cls, business) -> str:
+        """Number the next voucher will most likely get (display only; nothing is reserved)."""
+        seq = cls.objects.filter(business=business).values_list("next_number", flat=True).first()
+        return str(seq if seq is not None else cls._initial_number(business))
+
+    @classmethod
+    def allocate(cls, business) -> str:
+        """
+        Reserve and return the next voucher number. Call inside transaction.atomic() so the row
+        lock is held until the voucher is saved. Numbers already taken (e.g. typed in by hand)
+        are skipped.
+        """
+        seq, _ = cls.objects.select_for_update().get_or_create(
+            business=business,
+            defaults={"next_number": lambda: cls._initial_number(business)},
+        )
+        n = seq.next_number
+        while Voucher.objects.filter(business=business, number=str(n)).exists():
+            n += 1
+        seq.next_number = n + 1
+        seq.save(update_fields=["next_number"])
+        return str(n)
+
+
+class LedgerAggregate(models.Model):
+    """
+    Posted Dr/Cr totals per ledger, so balance reads don't rescan VoucherLine.
+    A row holds its ledger's posted lines with id <= last_line_id; reads add the posted lines
+    above that watermark in the same query, so new postings show without touching the row.
+    Building rows, folding a post into them and discarding them all hold the business row
+    lock (_lock), so a build can never miss a post or resurrect a deleted voucher.
+    """
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name="ledger_aggregates")
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, related_name="aggregate")
+    total_dr = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    total_cr = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    last_line_id = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.account} Dr {self.total_dr} Cr {self.total_cr} (lines <= {self.last_line_id})"
+
+    @staticmethod
+    def _lock(business) -> None:
+        """
+        Lock the business row until the current transaction ends. FOR NO KEY UPDATE, so inserts
+        referencing the business (vouchers, lines, accounts) are not blocked by it.
+        """
+        bid = getattr(business, "pk", business)
+        list(Business.objects.select_for_update(no_key=True).filter(pk=bid).values_list("pk", flat=True))
+
+    @staticmethod
+    def posted_totals(business, account_ids, upto_line_id=None) -> dict:
+        """{account_id: (dr, cr)} summed live from posted lines (one GROUP BY query)."""
+        lines = VoucherLine.objects.filter(
+            voucher__business=business, voucher__is_posted=True, account_id__in=account_ids
+        )
+        if upto_line_id is not None:
+            lines = lines.filter(id__lte=upto_line_id)
+        rows = lines.order_by().values_list("account_id").annotate(dr=Sum("debit"), cr=Sum("credit"))
+        cent = Decimal("0.01")
+        return {aid: (dr.quantize(cent), cr.quantize(cent)) for aid, dr, cr in rows}
+
+    @classmethod
+    def _stored_with_tail(cls, business, account_ids) -> dict:
+        """{account_id: (dr, cr)}: stored totals plus posted lines above each watermark, in one query."""
+        tail = (
+            VoucherLine.objects.filter(
+                account_id=OuterRef("account_id"), voucher__is_posted=True, id__gt=OuterRef("last_line_id")
+            )
+            .order_by()
+            .values("account_id")
+        )
+        rows = (
+            cls.objects.filter(business=business, account_id__in=account_ids)
+            .annotate(
+                tail_dr=Subquery(tail.annotate(s=Sum("debit")).values("s")),
+                tail_cr=Subquery(tail.annotate(s=Sum("credit")).values("s")),
+            )
+            .values_list("account_id", "total_dr", "total_cr", "tail_dr", "tail_cr")
+        )
+        cent = Decimal("0.01")
+        return {
+            aid: ((dr + (tail_dr or 0)).quantize(cent), (cr + (tail_cr or 0)).quantize(cent))
+            for aid, dr, cr, tail_dr, tail_cr in rows
+        }
+
+    @classmethod
+    def _build(cls, business, account_ids) -> None:
+        """Store rows for the given ledgers that have none yet. Caller holds _lock."""
+        have = set(cls.objects.filter(business=business, account_id__in=account_ids).values_list("account_id", flat=True))
+        todo = [aid for aid in account_ids if aid not in have]
+        if not todo:
+            return
+        upto = VoucherLine.objects.filter(voucher__business=business).aggregate(m=Max("id"))["m"] or 0
+        live = cls.posted_totals(business, todo, upto_line_id=upto)
+        zero = (Decimal("0.00"), Decimal("0.00"))
+        cls.objects.bulk_create(
+            [
+                cls(business=business, account_id=aid, total_dr=dr, total_cr=cr, last_line_id=upto)
+                for aid, (dr, cr) in ((aid, live.get(aid, zero)) for aid in todo)
+            ],
+            ignore_conflicts=True,
+        )
+
+    @classmethod
+    def balances(cls, business, account_ids) -> dict:
+        """
+        {account_id: (total_dr, total_cr)} of posted lines for the given ledgers.
+        Ledgers without a row get one built (under the lock) and are then read the same way.
+        """
+        account_ids = list(account_ids)
+        result = cls._stored_with_tail(business, account_ids)
+        missing = [aid for aid in account_ids if aid not in result]
+        if missing:
+            with transaction.atomic():
+                cls._lock(business)
+                cls._build(business, missing)
+            result.update(cls._stored_with_tail(business, missing))
+        return result
+
+    @classmethod
+    def apply_voucher(cls, voucher) -> None:
+        """
+        Fold a just-posted voucher into the stored rows of its ledgers. Its lines at or below a
+        row's watermark are added directly; everything above it (this voucher's other lines and
+        earlier posts) is summed in and the watermark moves up. Rows not built yet are left alone.
+        """
+        cls._lock(voucher.business_id)
+        lines = list(voucher.lines.values_list("account_id", "id", "debit", "credit"))
+        rows = {
+            row.account_id: row
+            for row in cls.objects.filter(
+                business_id=voucher.business_id, account_id__in={aid for aid, _, _, _ in lines}
+            )
+        }
+        if not rows:
+            return
+        for aid, line_id, dr, cr in lines:
+            row = rows.get(aid)
+            if row is not None and line_id <= row.last_line_id:
+                row.total_dr += dr
+                row.total_cr += cr
+        tail = (
+            VoucherLine.objects.filter(
+                account_id__in=rows, voucher__is_posted=True, id__gt=F("account__aggregate__last_line_id")
+            )
+            .order_by()
+            .values_list("account_id")
+            .annotate(dr=Sum("debit"), cr=Sum("credit"), top=Max("id"))
+        )
+        for aid, dr, cr, top in tail:
+            row = rows[aid]
+            row.total_dr += dr
+            row.total_cr += cr
+            row.last_line_id = top
+        cls.objects.bulk_update(list(rows.values()), ["total_dr", "total_cr", "last_line_id"])
+
+    @classmethod
+    def discard(cls, business) -> None:
+        """
+        Drop the stored rows of a business (after deleting or un-posting vouchers, or editing
+        posted lines). Holds the lock for the rest of the caller's transaction, so no read can
+        rebuild rows from the data being changed.
+        """
+        with transaction.atomic():
+            cls._lock(business)
+            cls.objects.filter(business=business).delete()
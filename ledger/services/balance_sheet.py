@@ -5,9 +5,10 @@ Current Assets total includes Closing Stock (inventory valuation).
 """
 from decimal import Decimal
 from collections import defaultdict
-from datetime import date
 
+from django.db import connection
 from django.db.models import Sum
+from django.utils import timezone
 
 from ledger.models import Account, VoucherLine
 from ledger.services.stock_valuation import closing_stock_value
@@ -15,7 +16,7 @@ from ledger.services.stock_valuation import closing_stock_value
 # Standard root group names (top-level buckets like Assets/Liabilities/etc.)
 # Primary groups like "Capital Account", "Loans (Liability)", "Current Liabilities"
 # will typically be additional root groups with the same root_type.
-STANDARD_ROOT_NAMES = ("Assets", "Liabilities", "Income", "Expenses")
+STANDARD_ROOT_NAMES = frozenset({"Assets", "Liabilities", "Income", "Expenses"})
 
 
 def _ledger_closing_balances(business, end_date=None):
@@ -63,7 +64,55 @@ def _descendant_ledger_ids(group_id, children_map, account_map):
     return ids
 
 
-def compute_balance_sheet(business, end_date=None):
+def _ledger_root_rows(business):
+    """
+    Return [(root_id, root_name, root_type, root_is_group, account_id, is_group), ...] for
+    every root account (parent_id IS NULL) and every ledger beneath it, resolved in one
+    recursive CTE instead of building the tree in Python.
+    A root appears with account_id == root_id; ledgers appear with is_group false.
+    """
+    table = connection.ops.quote_name(Account._meta.db_table)
+    sql = f"""
+        WITH RECURSIVE tree (id, is_group, root_id, root_name, root_type, root_is_group) AS (
+            SELECT id, is_group, id, name, root_type, is_group
+            FROM {table}
+            WHERE parent_id IS NULL AND business_id = %s
+            UNION ALL
+            SELECT c.id, c.is_group, t.root_id, t.root_name, t.root_type, t.root_is_group
+            FROM {table} c
+            JOIN tree t ON c.parent_id = t.id
+        )
+        SELECT root_id, root_name, root_type, root_is_group, id, is_group
+        FROM tree
+        WHERE id = root_id OR is_group = %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [business.pk, False])
+        return cursor.fetchall()
+
+
+def compute_balance_sheet(business, end_date=None, today=None, stamp=None):
+    """
+    Cached entry point for _compute_balance_sheet (same arguments and return value).
+    Results are memoized per (business, end date) and invalidated by the business data stamp.
+    today: the local date a missing end_date stands for; defaults to timezone.localdate().
+    stamp: the business data stamp if the caller already read it (see cached_report).
+    """
+    from ledger.services.report_cache import cached_report
+
+    today = today or timezone.localdate()
+    # today is part of the key: without end_date, closing stock is valued as of today
+    args = (end_date, today)
+    return cached_report(
+        "bs",
+        business,
+        args,
+        lambda: _compute_balance_sheet(business, end_date=end_date, today=today, stamp=stamp),
+        stamp=stamp,
+    )
+
+
+def _compute_balance_sheet(business, end_date=None, today=None, stamp=None):
     """
     Returns:
     {
@@ -78,16 +127,17 @@ def compute_balance_sheet(business, end_date=None):
 
     closing_by_ledger = _ledger_closing_balances(business, end_date)
 
-    # Build tree: parent_id -> list of child accounts; and account_id -> {name, is_group, root_type}
-    accounts = Account.objects.filter(business=business).values("id", "parent_id", "name", "is_group", "root_type")
-    children_map = defaultdict(list)
+    # Roots (parent_id is None) with their ledger subtree totals, from one recursive CTE
     account_map = {}
-    for a in accounts:
-        children_map[a["parent_id"]].append(a["id"])
-        account_map[a["id"]] = a
+    root_totals = defaultdict(lambda: Decimal("0.00"))
+    for root_id, root_name, root_type, root_is_group, aid, is_group in _ledger_root_rows(business):
+        if aid == root_id:
+            account_map[root_id] = {"name": root_name, "is_group": root_is_group, "root_type": root_type}
+        if not is_group:
+            root_totals[root_id] += closing_by_ledger.get(aid, Decimal("0.00"))
 
-    # Root groups (parent_id is None) that participate in the Balance Sheet
-    root_ids = children_map.get(None, [])
+    # Root groups that participate in the Balance Sheet
+    root_ids = list(account_map)
 
     # Prefer non-standard primary groups (e.g. Capital Account, Loans, Current Liabilities, Current Assets)
     liability_root_ids = [
@@ -118,33 +168,35 @@ def compute_balance_sheet(business, end_date=None):
         sign_for_display:
           -  1 = assets (debit balance positive)
           - -1 = liabilities (credit balance positive)
-        Returns list of {"name", "amount", "group_id"} for linking to Group Summary.
+        Returns (rows, total): rows is a list of {"name", "amount", "group_id"} for linking
+        to Group Summary; total is the sum of the row amounts, accumulated as rows are built.
         """
         rows = []
+        total = Decimal("0.00")
         for root_id in sorted(root_ids, key=lambda i: (account_map.get(i) or {}).get("name") or ""):
             acc = account_map.get(root_id)
             if not acc or not acc.get("is_group"):
                 continue
             name = acc.get("name") or "—"
-            ledger_ids = _descendant_ledger_ids(root_id, children_map, account_map)
-            total = sum(closing_by_ledger.get(lid, Decimal("0.00")) for lid in ledger_ids)
-            total = (sign_for_display * total).quantize(Decimal("0.01"))
-            rows.append({"name": name, "amount": total, "group_id": root_id})
-        return rows
+            amount = (sign_for_display * root_totals.get(root_id, Decimal("0.00"))).quantize(Decimal("0.01"))
+            rows.append({"name": name, "amount": amount, "group_id": root_id})
+            total += amount
+        return rows, total
 
     # Liabilities: credit balance is normal, so show as positive (multiply by -1)
-    liability_rows = group_balances(liability_root_ids, sign_for_display=-1)
+    liability_rows, total_liabilities = group_balances(liability_root_ids, sign_for_display=-1)
     # Assets: debit balance is normal (already positive)
-    asset_rows = group_balances(asset_root_ids, sign_for_display=1)
+    asset_rows, total_assets = group_balances(asset_root_ids, sign_for_display=1)
 
     # Current Assets: add Closing Stock (inventory valuation) so Balance Sheet matches Group Summary
-    as_of = end_date if end_date else date.today()
+    as_of = end_date or today or timezone.localdate()
     closing_stock = closing_stock_value(business, as_of, godown=None).quantize(Decimal("0.01"))
     _asset_rows = []
     for row in asset_rows:
         name, amt = row["name"], row["amount"]
         if name and (name.strip().lower() == "current assets"):
             amt = (amt + closing_stock).quantize(Decimal("0.01"))
+            total_assets += closing_stock
         _asset_rows.append({"name": name, "amount": amt, "group_id": row["group_id"]})
     asset_rows = _asset_rows
 
@@ -154,12 +206,13 @@ def compute_balance_sheet(business, end_date=None):
         start_date=None,
         end_date=end_date,
         godown=None,
+        today=today,
+        stamp=stamp,
     )
     gross_profit = (pnl_data.get("gross_profit") or Decimal("0.00")).quantize(Decimal("0.01"))
 
     # Profit & Loss A/c row shows gross profit (positive = profit, negative = loss)
-    total_liabilities = sum(r["amount"] for r in liability_rows) + gross_profit
-    total_assets = sum(r["amount"] for r in asset_rows)
+    total_liabilities += gross_profit
 
     return {
         "liability_rows": liability_rows,
@@ -4,7 +4,8 @@ with ledgers listed under each and a Grand Total.
 """
 from decimal import Decimal
 from collections import defaultdict
-from datetime import date
+
+from django.utils import timezone
 
 from ledger.models import Account
 from ledger.services.balance_sheet import (
@@ -16,7 +17,7 @@ from ledger.services.balance_sheet import (
 CASH_BANK_GROUP_NAMES = ("Cash-in-hand", "Bank Accounts")
 
 
-def compute_cash_bank_summary(business, end_date=None):
+def compute_cash_bank_summary(business, end_date=None, today=None):
     """
     Returns:
     {
@@ -34,7 +35,7 @@ def compute_cash_bank_summary(business, end_date=None):
       "end_date": date | None,
     }
     """
-    as_of = end_date if end_date else date.today()
+    as_of = end_date or today or timezone.localdate()
     closing_net_by_ledger = _ledger_closing_balances(business, end_date=as_of)
 
     # closing_net -> (debit col, credit col) for display
@@ -0,0 +1,23 @@
+"""
+Integer-cents helpers for report totals.
+Amounts here are already rounded to 2 decimal places, so int cents are exact; loops add
+Python ints and convert back to Decimal once at the API boundary.
+"""
+from decimal import Decimal
+
+
+def to_cents(amount):
+    """Decimal with at most 2 decimal places -> int cents (exact)."""
+    return int(amount.scaleb(2))
+
+
+def from_cents(cents):
+    """int cents -> Decimal with 2 decimal places."""
+    return Decimal(cents).scaleb(-2)
+
+
+def to_money(value):
+    """Decimal rounded to 0.01 from a Decimal, int or str/float amount (str() only when needed)."""
+    if not isinstance(value, (Decimal, int)):
+        value = Decimal(str(value))
+    return Decimal(value).quantize(Decimal("0.01"))
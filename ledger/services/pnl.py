@@ -6,12 +6,17 @@ Profit & Loss computation: accounting + inventory-integrated (Tally-style).
 - Gross Profit = Sales − COGS
 - Net Profit = Gross Profit − Indirect Expenses + Other Income
 """
+import re
 from decimal import Decimal
-from datetime import date
 
-from django.db.models import Sum
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Sum
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 from ledger.models import Account, VoucherLine
+from ledger.services.money import from_cents, to_cents, to_money
 
 # Name hints when hierarchy says non–P&L (e.g. ledger under Assets). Use sparingly.
 _INCOME_NAME_HINTS = ("sales", "revenue", "income")
@@ -21,43 +26,179 @@ _SALES_NAME_HINTS = ("sales", "revenue", "sale")
 _PURCHASE_NAME_HINTS = ("purchase", "purchases", "purch")
 
 
+def _hint_re(hints):
+    return re.compile("|".join(re.escape(h) for h in hints))
+
+
+# One compiled alternation per hint tuple: a single regex scan replaces any() over substrings.
+# Kept per tuple (not one combined pattern) so the income-before-expense precedence holds
+# when a name contains hints from both lists.
+_INCOME_HINT_RE = _hint_re(_INCOME_NAME_HINTS)
+_EXPENSE_HINT_RE = _hint_re(_EXPENSE_NAME_HINTS)
+_SALES_HINT_RE = _hint_re(_SALES_NAME_HINTS)
+_PURCHASE_HINT_RE = _hint_re(_PURCHASE_NAME_HINTS)
+
+
+def _hint_text(name_lower, parent_name_lower):
+    """Account and parent names in one string ("\\n" never occurs in a hint), scanned once per regex."""
+    return f"{name_lower or ''}\n{parent_name_lower or ''}"
+
+
+# Debug label per P&L bucket (debug_rows "classification")
+_BUCKET_LABELS = {
+    "sales": "Sales",
+    "purchases": "Purchase",
+    "other_income": "Other Income",
+    "indirect_expense": "Indirect Expense",
+}
+
+
+def _classify_account(row, root_types_walk):
+    """
+    Classify one (id, name, root_type, parent__root_type, name_lower, parent_name_lower) row.
+    Returns (id, name, root_type, bucket): the string/hierarchy part of the P&L classification,
+    which depends only on the chart of accounts. bucket is one of _BUCKET_LABELS, or None when
+    the account is not INCOME/EXPENSE.
+    """
+    aid, raw_name, rt_acc, rt_parent, name_lower, parent_name_lower = row
+    rt_acc = (rt_acc or "").strip() or None
+    rt_parent = (rt_parent or "").strip() or None
+    if rt_acc in ("INCOME", "EXPENSE"):
+        root_type = rt_acc
+    elif rt_parent in ("INCOME", "EXPENSE"):
+        root_type = rt_parent
+    else:
+        root_type = root_types_walk.get(aid)
+
+    name = (raw_name or "").strip() or "?"
+    hint_text = _hint_text(name_lower, parent_name_lower)
+
+    if not root_type or root_type not in ("INCOME", "EXPENSE"):
+        if _INCOME_HINT_RE.search(hint_text):
+            root_type = "INCOME"
+        elif _EXPENSE_HINT_RE.search(hint_text):
+            root_type = "EXPENSE"
+        else:
+            return aid, name, root_type, None
+
+    if root_type == "INCOME":
+        bucket = "sales" if _SALES_HINT_RE.search(hint_text) else "other_income"
+    else:
+        bucket = "purchases" if _PURCHASE_HINT_RE.search(hint_text) else "indirect_expense"
+    return aid, name, root_type, bucket
+
+
+def _account_classes(business):
+    """
+    [(id, name, root_type, bucket), ...] for every ledger of the business, ordered by name.
+    Cached per chart-of-accounts stamp, so a P&L render only does the numeric part (sign of the
+    net and zero check) per account; name hints and root-type walks run once per COA change.
+    """
+    from ledger.services.report_cache import REPORT_CACHE_TTL, chart_of_accounts_stamp
+
+    def build():
+        rows = list(
+            Account.objects.filter(business=business, is_group=False)
+            # lowercase names come from the query, so the hint scan never calls str.lower()
+            .annotate(name_lower=Lower("name"), parent_name_lower=Lower("parent__name"))
+            .values_list("id", "name", "root_type", "parent__root_type", "name_lower", "parent_name_lower")
+            .order_by("name")
+        )
+        root_types_walk = _resolve_root_types(business, [row[0] for row in rows])
+        return [_classify_account(row, root_types_walk) for row in rows]
+
+    count, last_updated = chart_of_accounts_stamp(business)
+    key = f"pnl_account_classes:{business.pk}:{count}:{last_updated}"
+    return cache.get_or_set(key, build, REPORT_CACHE_TTL)
+
+
+def _net_amount(root_type, net):
+    """Signed P&L amount from the SQL net (Dr − Cr): credit balance for INCOME, debit for EXPENSE."""
+    # some backends (sqlite) return expression sums unscaled; keep 2 dp like dr/cr
+    net = (net or Decimal("0.00")).quantize(Decimal("0.01"))
+    return -net if root_type == "INCOME" else net
+
+
+def _classify_rows(classes, totals_by_account):
+    """Production path: return {bucket: [(name, amt), ...]} with no debug bookkeeping."""
+    buckets = {key: [] for key in _BUCKET_LABELS}
+    for aid, name, root_type, bucket in classes:
+        totals = totals_by_account.get(aid)
+        if totals is None or bucket is None:
+            continue
+        amt = _net_amount(root_type, totals[2])
+        if amt != 0:
+            buckets[bucket].append((name, amt))
+    return buckets
+
+
+def _classify_rows_debug(classes, totals_by_account):
+    """Same as _classify_rows, plus one debug_rows record per account: (buckets, debug_rows)."""
+    buckets = {key: [] for key in _BUCKET_LABELS}
+    debug_rows = []
+    for aid, name, root_type, bucket in classes:
+        totals = totals_by_account.get(aid)
+        if totals is None:
+            continue
+        dr, cr, net = totals
+        if bucket is None:
+            classification = "skipped (not INCOME/EXPENSE)"
+        else:
+            amt = _net_amount(root_type, net)
+            if amt == 0:
+                classification = f"{root_type} (amt=0, skipped)"
+            else:
+                buckets[bucket].append((name, amt))
+                classification = f"{_BUCKET_LABELS[bucket]} → {amt}"
+        debug_rows.append({
+            "account_id": aid,
+            "name": name,
+            "dr": dr or Decimal("0.00"),
+            "cr": cr or Decimal("0.00"),
+            "root_type": root_type or "(none)",
+            "classification": classification,
+        })
+    return buckets, debug_rows
+
+
+def _root_type_map(business):
+    """
+    {account_id: root account's root_type} for every account of the business, from one recursive
+    CTE walking down from the roots. Accounts not reachable from a root (parent cycles) are absent.
+    """
+    table = connection.ops.quote_name(Account._meta.db_table)
+    sql = f"""
+        WITH RECURSIVE tree (id, root_type) AS (
+            SELECT id, root_type
+            FROM {table}
+            WHERE parent_id IS NULL AND business_id = %s
+            UNION ALL
+            SELECT c.id, t.root_type
+            FROM {table} c
+            JOIN tree t ON c.parent_id = t.id
+            WHERE c.business_id = %s
+        )
+        SELECT id, root_type FROM tree
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [business.pk, business.pk])
+        return {aid: (root_type or "").strip() or None for aid, root_type in cursor.fetchall()}
+
+
 def _resolve_root_types(business, account_ids):
     """
     For each account id, walk parent chain to root; return root's root_type.
-    Uses single bulk fetch to avoid N+1.
+    The whole business map is cached per chart-of-accounts stamp (account count, last
+    updated_at): COA edits are rare next to report renders, so most calls only run the stamp query.
     """
+    from ledger.services.report_cache import REPORT_CACHE_TTL, chart_of_accounts_stamp
+
     if not account_ids:
         return {}
-    accounts = {
-        a["id"]: {"parent_id": a["parent_id"], "root_type": (a["root_type"] or "").strip() or None}
-        for a in Account.objects.filter(business=business).values("id", "parent_id", "root_type")
-    }
-    cache = {}
-
-    def walk(aid, seen):
-        if aid in cache:
-            return cache[aid]
-        if aid in seen:
-            cache[aid] = None
-            return None
-        seen.add(aid)
-        acc = accounts.get(aid)
-        if not acc:
-            cache[aid] = None
-            return None
-        pid = acc["parent_id"]
-        rt = acc["root_type"]
-        if pid is None:
-            cache[aid] = rt
-            return rt
-        parent_rt = walk(pid, seen)
-        cache[aid] = parent_rt
-        return parent_rt
-
-    for aid in account_ids:
-        if aid not in cache:
-            walk(aid, set())
-    return cache
+    count, last_updated = chart_of_accounts_stamp(business)
+    key = f"pnl_root_types:{business.pk}:{count}:{last_updated}"
+    root_types = cache.get_or_set(key, lambda: _root_type_map(business), REPORT_CACHE_TTL)
+    return {aid: root_types.get(aid) for aid in account_ids}
 
 
 def compute_profit_and_loss(
@@ -68,6 +209,53 @@ def compute_profit_and_loss(
     godown=None,
     opening_stock_override=None,
     closing_stock_override=None,
+    today=None,
+    stamp=None,
+):
+    """
+    Cached entry point for _compute_profit_and_loss (same arguments and return value).
+    Results are memoized per (business, period, godown, overrides) and invalidated by the
+    business data stamp; debug runs always recompute so debug_rows reflect the live data.
+    today: the local date a missing end_date stands for (views pass the request's, so the
+    report, its cache key and its ETag agree); defaults to timezone.localdate().
+    stamp: the business data stamp if the caller already read it (see cached_report).
+    """
+    from ledger.services.report_cache import cached_report
+
+    today = today or timezone.localdate()
+    kwargs = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "godown": godown,
+        "opening_stock_override": opening_stock_override,
+        "closing_stock_override": closing_stock_override,
+        "today": today,
+    }
+    if debug:
+        return _compute_profit_and_loss(business, debug=True, **kwargs)
+    # today is part of the key: without end_date, closing stock is valued as of today
+    args = (
+        start_date,
+        end_date,
+        today,
+        getattr(godown, "pk", None),
+        opening_stock_override,
+        closing_stock_override,
+    )
+    return cached_report(
+        "pnl", business, args, lambda: _compute_profit_and_loss(business, **kwargs), stamp=stamp
+    )
+
+
+def _compute_profit_and_loss(
+    business,
+    start_date=None,
+    end_date=None,
+    debug=False,
+    godown=None,
+    opening_stock_override=None,
+    closing_stock_override=None,
+    today=None,
 ):
     """
     Inventory-integrated P&L (Tally-style).
@@ -95,7 +283,11 @@ def compute_profit_and_loss(
     }
     If debug=True, also returns "debug_rows".
     """
-    from ledger.services.stock_valuation import closing_stock_value, opening_stock_value
+    from ledger.services.stock_valuation import (
+        closing_stock_value,
+        opening_and_closing_values,
+        opening_stock_value,
+    )
 
     qs = VoucherLine.objects.filter(
         voucher__business=business,
@@ -108,115 +300,49 @@ def compute_profit_and_loss(
     if end_date:
         qs = qs.filter(voucher__posting_date__lte=end_date)
 
-    rows = (
-        qs.values(
-            "account_id",
-            "account__name",
-            "account__root_type",
-            "account__parent__root_type",
-            "account__parent__name",
-        )
-        .annotate(
+    # GROUP BY account_id only; name/root_type metadata comes from the cached account classes.
+    # net (Dr − Cr) is summed in SQL so the classification loop only picks its sign.
+    totals_by_account = {
+        r["account_id"]: (r["dr"], r["cr"], r["net"])
+        for r in qs.order_by().values("account_id").annotate(
             dr=Sum("debit", default=Decimal("0.00")),
             cr=Sum("credit", default=Decimal("0.00")),
+            net=Sum(F("debit") - F("credit"), default=Decimal("0.00")),
         )
-        .order_by("account__name")
-    )
-
-    account_ids = {r["account_id"] for r in rows}
-    root_types_walk = _resolve_root_types(business, account_ids)
-
-    sales = []
-    purchases = []
-    other_income = []
-    indirect_expense = []
-    sales_total = Decimal("0.00")
-    purchase_total = Decimal("0.00")
-    other_income_total = Decimal("0.00")
-    indirect_expense_total = Decimal("0.00")
-    debug_rows = [] if debug else None
-
-    for r in rows:
-        rt_acc = (r.get("account__root_type") or "").strip() or None
-        rt_parent = (r.get("account__parent__root_type") or "").strip() or None
-        rt_walk = root_types_walk.get(r["account_id"])
-        if rt_acc in ("INCOME", "EXPENSE"):
-            root_type = rt_acc
-        elif rt_parent in ("INCOME", "EXPENSE"):
-            root_type = rt_parent
-        else:
-            root_type = rt_walk
-
-        name = (r.get("account__name") or "").strip() or "?"
-        name_lower = name.lower()
-        parent_name = (r.get("account__parent__name") or "").strip() or ""
-        parent_name_lower = parent_name.lower()
-
-        if not root_type or root_type not in ("INCOME", "EXPENSE"):
-            if any(h in name_lower for h in _INCOME_NAME_HINTS) or any(h in parent_name_lower for h in _INCOME_NAME_HINTS):
-                root_type = "INCOME"
-            elif any(h in name_lower for h in _EXPENSE_NAME_HINTS) or any(h in parent_name_lower for h in _EXPENSE_NAME_HINTS):
-                root_type = "EXPENSE"
-        dr = r["dr"] or Decimal("0.00")
-        cr = r["cr"] or Decimal("0.00")
-
-        if debug:
-            debug_rows.append({
-                "account_id": r["account_id"],
-                "name": name,
-                "dr": dr,
-                "cr": cr,
-                "root_type": root_type or "(none)",
-            })
-
-        if not root_type or root_type not in ("INCOME", "EXPENSE"):
-            if debug:
-                debug_rows[-1]["classification"] = "skipped (not INCOME/EXPENSE)"
-            continue
+    }
+    classes = _account_classes(business)
 
-        if root_type == "INCOME":
-            amt = cr - dr
-            if amt == 0:
-                if debug:
-                    debug_rows[-1]["classification"] = "INCOME (amt=0, skipped)"
-                continue
-            if any(h in name_lower for h in _SALES_NAME_HINTS) or any(h in parent_name_lower for h in _SALES_NAME_HINTS):
-                sales.append((name, amt))
-                sales_total += amt
-                if debug:
-                    debug_rows[-1]["classification"] = f"Sales → {amt}"
-            else:
-                other_income.append((name, amt))
-                other_income_total += amt
-                if debug:
-                    debug_rows[-1]["classification"] = f"Other Income → {amt}"
-        else:
-            amt = dr - cr
-            if amt == 0:
-                if debug:
-                    debug_rows[-1]["classification"] = "EXPENSE (amt=0, skipped)"
-                continue
-            if any(h in name_lower for h in _PURCHASE_NAME_HINTS) or any(h in parent_name_lower for h in _PURCHASE_NAME_HINTS):
-                purchases.append((name, amt))
-                purchase_total += amt
-                if debug:
-                    debug_rows[-1]["classification"] = f"Purchase → {amt}"
-            else:
-                indirect_expense.append((name, amt))
-                indirect_expense_total += amt
-                if debug:
-                    debug_rows[-1]["classification"] = f"Indirect Expense → {amt}"
+    if debug:
+        buckets, debug_rows = _classify_rows_debug(classes, totals_by_account)
+    else:
+        buckets = _classify_rows(classes, totals_by_account)
+    sales = buckets["sales"]
+    purchases = buckets["purchases"]
+    other_income = buckets["other_income"]
+    indirect_expense = buckets["indirect_expense"]
+    # Totals once per bucket after classification, not accumulated inside the row loop.
+    # Amounts are rounded to 0.01, so they are added as int cents and converted back once.
+    sales_total = from_cents(sum(to_cents(a) for _, a in sales))
+    purchase_total = from_cents(sum(to_cents(a) for _, a in purchases))
+    other_income_total = from_cents(sum(to_cents(a) for _, a in other_income))
+    indirect_expense_total = from_cents(sum(to_cents(a) for _, a in indirect_expense))
 
     # Stock valuation: as of end_date (or today if no end_date); optional godown; overrides take precedence (e.g. ?closing_stock=803000 to match Tally)
-    period_end = end_date if end_date else date.today()
-    if opening_stock_override is not None:
-        opening_stock = Decimal(str(opening_stock_override)).quantize(Decimal("0.01"))
-    else:
-        opening_stock = opening_stock_value(business, start_date, godown=godown)
-    if closing_stock_override is not None:
-        closing_stock = Decimal(str(closing_stock_override)).quantize(Decimal("0.01"))
+    period_end = end_date or today or timezone.localdate()
+    if opening_stock_override is None and closing_stock_override is None:
+        # Both cut-offs from one StockLedgerEntry query
+        opening_stock, closing_stock = opening_and_closing_values(
+            business, start_date, period_end, godown=godown
+        )
     else:
-        closing_stock = closing_stock_value(business, period_end, godown=godown)
+        if opening_stock_override is not None:
+            opening_stock = to_money(opening_stock_override)
+        else:
+            opening_stock = opening_stock_value(business, start_date, godown=godown)
+        if closing_stock_override is not None:
+            closing_stock = to_money(closing_stock_override)
+        else:
+            closing_stock = closing_stock_value(business, period_end, godown=godown)
 
     # COGS = Opening Stock + Purchases − Closing Stock
     cogs = (opening_stock + purchase_total - closing_stock).quantize(Decimal("0.01"))
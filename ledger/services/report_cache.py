@@ -0,0 +1,47 @@
+"""
+Cached report results keyed on a per-business data stamp.
+The stamp is (row count, last updated_at) of the tables the reports read, so posting,
+editing or deleting a voucher, account or stock entry yields a new cache key and stale
+results simply age out. The stamp comes from the database, so it holds across processes.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+# Seconds a cached report result is kept (a new stamp bypasses it sooner)
+REPORT_CACHE_TTL = 300
+
+
+def business_data_stamp(business):
+    """Return a tuple that changes whenever vouchers, accounts or stock entries of the business change."""
+    from inventory.models import StockLedgerEntry
+    from ledger.models import Account, Voucher
+
+    stamp = []
+    for model in (Voucher, Account, StockLedgerEntry):
+        agg = model.objects.filter(business=business).aggregate(n=Count("id"), m=Max("updated_at"))
+        stamp.extend((agg["n"], agg["m"].isoformat() if agg["m"] else None))
+    return tuple(stamp)
+
+
+def chart_of_accounts_stamp(business):
+    """(account count, last account updated_at) of the business; changes whenever its COA changes."""
+    from ledger.models import Account
+
+    agg = Account.objects.filter(business=business).aggregate(n=Count("id"), m=Max("updated_at"))
+    return agg["n"], agg["m"].isoformat() if agg["m"] else None
+
+
+def cached_report(prefix, business, args, compute, ttl=REPORT_CACHE_TTL, stamp=None):
+    """
+    Return compute() memoized under (prefix, business, args, data stamp).
+    args: tuple of hashable/str-able inputs that select the report (dates, godown id, overrides).
+    stamp: business_data_stamp(business) if the caller already has it (views read it once
+    per request); computed here otherwise.
+    """
+    if stamp is None:
+        stamp = business_data_stamp(business)
+    raw = repr((business.pk, tuple(str(a) for a in args), stamp))
+    digest = hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+    return cache.get_or_set(f"{prefix}:{business.pk}:{digest}", compute, ttl)
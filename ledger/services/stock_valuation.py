@@ -3,9 +3,54 @@ Stock valuation for P&L: Opening Stock and Closing Stock values.
 Uses posted StockLedgerEntry only. Valuation = average rate (cost of goods received).
 """
 from decimal import Decimal
+from collections import defaultdict
 from datetime import timedelta
 
-from django.db.models import Sum
+from django.db.models import F, Q, Sum
+
+from ledger.services.money import from_cents, to_cents
+
+
+def _item_aggregates(prefix="", as_of_date=None):
+    """
+    Per-item aggregates needed for average-rate valuation, computed in one GROUP BY.
+    as_of_date: when set, each sum only counts entries up to that date (conditional aggregation),
+    so several cut-offs can share one query; keys are prefixed to keep them apart.
+    """
+    upto = Q(posting_date__lte=as_of_date) if as_of_date else Q()
+    return {
+        f"{prefix}qty_in_sum": Sum("qty_in", filter=upto, default=Decimal("0")),
+        f"{prefix}qty_out_sum": Sum("qty_out", filter=upto, default=Decimal("0")),
+        # Receipts only (qty_in > 0) for the average rate
+        f"{prefix}cost_in": Sum("amount", filter=upto & Q(qty_in__gt=0), default=Decimal("0")),
+        f"{prefix}qty_in_pos": Sum("qty_in", filter=upto & Q(qty_in__gt=0), default=Decimal("0")),
+    }
+
+
+_ITEM_AGGREGATES = _item_aggregates()
+
+
+def _has_value(prefix=""):
+    """
+    HAVING condition for rows _item_value would value above zero (closing qty > 0 and some
+    receipts), so sold-out or receipt-less items are dropped by the database, not in Python.
+    """
+    return Q(**{
+        f"{prefix}qty_in_sum__gt": F(f"{prefix}qty_out_sum"),
+        f"{prefix}qty_in_pos__gt": 0,
+    })
+
+
+def _item_value(row, prefix=""):
+    """Closing value of one item from its aggregate row: closing_qty * (cost_in / qty_in_pos), rounded."""
+    closing_qty = (row[f"{prefix}qty_in_sum"] or Decimal("0")) - (row[f"{prefix}qty_out_sum"] or Decimal("0"))
+    if closing_qty <= 0:
+        return Decimal("0.00")
+    qty_in_total = row[f"{prefix}qty_in_pos"] or Decimal("0")
+    if not qty_in_total or qty_in_total <= 0:
+        return Decimal("0.00")
+    avg_rate = (row[f"{prefix}cost_in"] or Decimal("0")) / qty_in_total
+    return (closing_qty * avg_rate).quantize(Decimal("0.01"))
 
 
 def closing_stock_value(business, as_of_date, godown=None):
@@ -28,27 +73,14 @@ def closing_stock_value(business, as_of_date, godown=None):
     if godown is not None:
         entries = entries.filter(godown=godown)
 
-    # Per item: balance qty and total cost in (for average rate)
-    # Use set() so each item is valued once (some DB/ORM combos can return duplicate ids from .distinct())
-    item_ids = list(set(entries.values_list("item_id", flat=True)))
-    total_value = Decimal("0.00")
-
-    for item_id in item_ids:
-        item_entries = entries.filter(item_id=item_id)
-        qty_in_sum = item_entries.aggregate(s=Sum("qty_in", default=Decimal("0")))["s"] or Decimal("0")
-        qty_out_sum = item_entries.aggregate(s=Sum("qty_out", default=Decimal("0")))["s"] or Decimal("0")
-        closing_qty = qty_in_sum - qty_out_sum
-        if closing_qty <= 0:
-            continue
-        # Average rate from receipts (qty_in > 0)
-        in_entries = item_entries.filter(qty_in__gt=0)
-        cost_in = in_entries.aggregate(s=Sum("amount", default=Decimal("0")))["s"] or Decimal("0")
-        qty_in_total = in_entries.aggregate(s=Sum("qty_in", default=Decimal("0")))["s"] or Decimal("0")
-        if qty_in_total and qty_in_total > 0:
-            avg_rate = cost_in / qty_in_total
-            total_value += (closing_qty * avg_rate).quantize(Decimal("0.01"))
-
-    return total_value
+    # One GROUP BY item_id query: each item appears once, valued in a single Python pass
+    rows = entries.order_by().values("item_id").annotate(**_ITEM_AGGREGATES).filter(_has_value())
+    # Item values are rounded to 0.01, so they are summed as int cents
+    total_cents = 0
+    for row in rows:
+        total_cents += to_cents(_item_value(row))
+
+    return from_cents(total_cents)
 
 
 def opening_stock_value(business, period_start_date, godown=None):
@@ -63,21 +95,100 @@ def opening_stock_value(business, period_start_date, godown=None):
     return closing_stock_value(business, day_before, godown=godown)
 
 
-def closing_stock_value_per_godown(business, as_of_date):
+def opening_and_closing_values(business, period_start_date, as_of_date, godown=None):
+    """
+    (opening, closing) stock values in one query: same results as opening_stock_value(business,
+    period_start_date, godown) and closing_stock_value(business, as_of_date, godown), with both
+    cut-offs evaluated as conditional sums over a single GROUP BY item_id.
+    """
+    from inventory.models import StockLedgerEntry
+
+    day_before = period_start_date - timedelta(days=1) if period_start_date else None
+    cutoffs = [d for d in (day_before, as_of_date) if d]
+    if not cutoffs:
+        return Decimal("0.00"), Decimal("0.00")
+
+    entries = StockLedgerEntry.objects.filter(
+        business=business,
+        is_posted=True,
+        posting_date__lte=max(cutoffs),
+    )
+    if godown is not None:
+        entries = entries.filter(godown=godown)
+
+    aggregates = {}
+    having = Q()
+    if day_before:
+        aggregates.update(_item_aggregates("open_", day_before))
+        having |= _has_value("open_")
+    if as_of_date:
+        aggregates.update(_item_aggregates("close_", as_of_date))
+        having |= _has_value("close_")
+    opening_cents = 0
+    closing_cents = 0
+    for row in entries.order_by().values("item_id").annotate(**aggregates).filter(having):
+        if day_before:
+            opening_cents += to_cents(_item_value(row, "open_"))
+        if as_of_date:
+            closing_cents += to_cents(_item_value(row, "close_"))
+    return from_cents(opening_cents), from_cents(closing_cents)
+
+
+def closing_stock_value_per_godown(business, as_of_date, stamp=None):
     """
-    Returns [(godown, value), ...] for each godown that has stock, plus total.
-    Used for report breakdown and godown selector.
+    Returns [(godown, value), ...] for each godown that has stock, plus total;
+    godown is a {"id", "name"} dict (all the breakdown and selector print).
+    The per-godown values are memoized on the business data stamp (see report_cache), so
+    repeat P&L renders for the same date skip the valuation; godowns themselves are loaded
+    fresh so a rename shows immediately.
     """
     try:
         from inventory.models import Godown
     except ImportError:
         return [], Decimal("0.00")
-    godowns = Godown.objects.filter(business=business).order_by("id")
+    if not as_of_date:
+        return [], Decimal("0.00")
+
+    from ledger.services.report_cache import cached_report
+
+    per_godown = cached_report(
+        "stock_per_godown",
+        business,
+        (as_of_date,),
+        lambda: _closing_value_by_godown(business, as_of_date),
+        stamp=stamp,
+    )
+    godowns = {
+        g["id"]: g
+        for g in Godown.objects.filter(
+            business=business, id__in=[gid for gid, val in per_godown.items() if val and val > 0]
+        ).values("id", "name")
+    }
     result = []
     total = Decimal("0.00")
-    for g in godowns:
-        val = closing_stock_value(business, as_of_date, godown=g)
-        if val and val > 0:
-            result.append((g, val))
-            total += val
+    for gid in sorted(godowns):
+        val = per_godown[gid]
+        result.append((godowns[gid], val))
+        total += val
     return result, total
+
+
+def _closing_value_by_godown(business, as_of_date):
+    """{godown_id: closing value} as of as_of_date, from one query grouped by (godown_id, item_id)."""
+    from inventory.models import StockLedgerEntry
+
+    rows = (
+        StockLedgerEntry.objects.filter(
+            business=business,
+            is_posted=True,
+            posting_date__lte=as_of_date,
+        )
+        .order_by()
+        .values("godown_id", "item_id")
+        .annotate(**_ITEM_AGGREGATES)
+        .filter(_has_value())
+    )
+    per_godown_cents = defaultdict(int)
+    for row in rows:
+        per_godown_cents[row["godown_id"]] += to_cents(_item_value(row))
+    return {gid: from_cents(cents) for gid, cents in per_godown_cents.items()}
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import LedgerAggregate, Voucher, VoucherLine
+
+
+@receiver(pre_delete, sender=Voucher)
+def discard_aggregates_on_posted_delete(sender, instance, **kwargs):
+    """Deleting a posted voucher (view, admin or cascade) makes the stored ledger totals stale."""
+    if instance.is_posted:
+        LedgerAggregate.discard(instance.business_id)
+
+
+@receiver(pre_save, sender=Voucher)
+def note_posted_before_save(sender, instance, **kwargs):
+    """Remember whether a voucher saved as a draft was posted before (an un-post)."""
+    instance._was_posted = bool(
+        instance.pk and not instance.is_posted and Voucher.objects.filter(pk=instance.pk, is_posted=True).exists()
+    )
+
+
+@receiver(post_save, sender=Voucher)
+def discard_aggregates_on_unpost(sender, instance, **kwargs):
+    """Un-posting takes the voucher's lines out of the posted totals."""
+    if getattr(instance, "_was_posted", False):
+        LedgerAggregate.discard(instance.business_id)
+
+
+@receiver(post_save, sender=VoucherLine)
+@receiver(post_delete, sender=VoucherLine)
+def discard_aggregates_on_posted_line_change(sender, instance, origin=None, **kwargs):
+    """Adding, editing or removing a line of a posted voucher (admin, shell) outside Voucher.post()."""
+    if origin is not None and getattr(origin, "model", type(origin)) is Voucher:
+        return  # cascade from a voucher delete: discard_aggregates_on_posted_delete covers it
+    if VoucherLine.voucher.is_cached(instance):
+        bid = instance.voucher.business_id if instance.voucher.is_posted else None
+    else:
+        bid = (
+            Voucher.objects.filter(pk=instance.voucher_id, is_posted=True)
+            .values_list("business_id", flat=True)
+            .first()
+        )
+    if bid is not None:
+        LedgerAggregate.discard(bid)
@@ -1,4 +1,3 @@
-from collections import defaultdict
 
 def get_active_business_id(request):
     """
@@ -7,24 +6,40 @@ def get_active_business_id(request):
     """
     return request.session.get("current_business_id")
 
+
+def get_active_business(request):
+    """
+    Active Business for the request, or None if none is selected or it no longer exists.
+    Memoized on the request only: a cross-request copy would outlive a rename or delete made
+    by another worker.
+    """
+    if not hasattr(request, "_active_business"):
+        from org.models import Business
+
+        bid = get_active_business_id(request)
+        request._active_business = Business.objects.filter(id=bid).first() if bid else None
+    return request._active_business
+
+
 def build_account_tree(accounts):
     """
     accounts: queryset/list of Account objects with .id and .parent_id
     returns list of root nodes: [{"obj": account, "children": [...]}]
     """
-    children_map = defaultdict(list)
-    node_map = {}
-
-    for a in accounts:
-        node_map[a.id] = {"obj": a, "children": []}
-        children_map[a.parent_id].append(a.id)
-
-    def attach(parent_id):
-        nodes = []
-        for child_id in sorted(children_map.get(parent_id, []), key=lambda i: node_map[i]["obj"].name.lower()):
-            node = node_map[child_id]
-            node["children"] = attach(child_id)
-            nodes.append(node)
-        return nodes
+    # One sort by (parent, name); appending in that order leaves every children list sorted
+    items = sorted(
+        accounts,
+        key=lambda a: (a.parent_id if a.parent_id is not None else -1, a.name.lower()),
+    )
+    node_map = {a.id: {"obj": a, "children": []} for a in items}
 
-    return attach(None)
+    roots = []
+    for a in items:
+        if a.parent_id is None:
+            roots.append(node_map[a.id])
+        else:
+            parent = node_map.get(a.parent_id)
+            # parent outside the given accounts: unreachable from a root, left out as before
+            if parent is not None:
+                parent["children"].append(node_map[a.id])
+    return roots
@@ -5,7 +5,7 @@ from decimal import Decimal
 from django.contrib import messages
 from django.core.exceptions import ValidationError
 from django.db import transaction, IntegrityError
-from django.db.models import Prefetch, Sum
+from django.db.models import Count, Q, Sum
 from django.http import Http404, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
@@ -14,73 +14,87 @@ from django.views.decorators.http import require_http_methods
 from .constants import LEDGERS_IN_OPENING_BAL_TOTAL
 from .forms import AccountForm, VoucherForm, VoucherLineFormSet
 from .forms_voucher_entry import VoucherEntryHeaderForm, ParticularFormSet
-from .models import Account, Voucher, VoucherLine
-from .utils import build_account_tree, get_active_business_id
+from .models import Account, BusinessVoucherSequence, LedgerAggregate, Voucher, VoucherLine, VoucherType
+from .services.money import from_cents, to_cents
+from .utils import build_account_tree, get_active_business, get_active_business_id
 
-# If your Business model lives elsewhere:
-from org.models import Business
+# Shared Decimal constants (immutable, so one instance serves every row)
+_ZERO = Decimal("0.00")
+_Q2 = Decimal("0.01")
+
+# Voucher types the simple entry screen (voucher_entry) accepts
+_ENTRY_VTYPES = frozenset(("RECEIPT", "PAYMENT", "CONTRA", "SALES", "PURCHASE"))
+
+# Voucher type choices are static; build the display list once at import
+_VTYPE_ITEMS = [{"value": choice[0], "label": choice[1]} for choice in VoucherType.choices]
 
 
 def _get_business_or_redirect(request):
     """Get active business or redirect to business selection. Returns (business, redirect_response)."""
-    bid = get_active_business_id(request)
-    if not bid:
+    if not get_active_business_id(request):
         return None, HttpResponseRedirect(reverse("org:select_business"))
-    return get_object_or_404(Business, id=bid), None
+    business = get_active_business(request)
+    if business is None:
+        raise Http404("No Business matches the given query.")
+    return business, None
 
 
 def _opening_balance_totals(business):
     """Sum opening balances (Dr/Cr) for ledgers in Bank Accounts, Cash-in-Hand, Capital Account."""
-    ledgers = Account.objects.filter(
+    # Blank type counts as Dr, like the form default
+    is_dr = Q(opening_balance_type__in=("DR", ""))
+    totals = Account.objects.filter(
         business=business,
         is_group=False,
         parent__name__in=LEDGERS_IN_OPENING_BAL_TOTAL,
-    ).select_related("parent")
-    total_dr = Decimal("0.00")
-    total_cr = Decimal("0.00")
-    for acc in ledgers:
-        amt = acc.opening_balance or Decimal("0.00")
-        if amt <= 0:
-            continue
-        if (acc.opening_balance_type or "DR") == "DR":
-            total_dr += amt
-        else:
-            total_cr += amt
-    return total_dr, total_cr
+        opening_balance__gt=0,
+    ).aggregate(
+        total_dr=Sum("opening_balance", filter=is_dr, default=_ZERO),
+        total_cr=Sum("opening_balance", filter=~is_dr, default=_ZERO),
+    )
+    return totals["total_dr"], totals["total_cr"]
+
+
+def _opening_balance_totals_cached(request, business):
+    """_opening_balance_totals memoized on the request, so retry/error render paths reuse one aggregate."""
+    if not hasattr(request, "_opening_balance_totals"):
+        request._opening_balance_totals = _opening_balance_totals(business)
+    return request._opening_balance_totals
 
 
 def _format_drcr(net: Decimal):
-    net = net or Decimal("0.00")
+    net = net or _ZERO
     if net >= 0:
-        return str(net.quantize(Decimal("0.01"))), "Dr"
-    return str((-net).quantize(Decimal("0.01"))), "Cr"
+        return str(net.quantize(_Q2)), "Dr"
+    return str((-net).quantize(_Q2)), "Cr"
+
+
+def _format_drcr_cents(net_cents: int):
+    """_format_drcr for an int-cents balance (no Decimal arithmetic per call)."""
+    if net_cents >= 0:
+        return str(from_cents(net_cents)), "Dr"
+    return str(from_cents(-net_cents)), "Cr"
 
 
 def api_account_balance(request, account_id: int):
     """Return current balance (posted vouchers only) for a ledger. Used for Cur Bal Dr/Cr and live preview."""
-    bid = get_active_business_id(request)
-    if not bid:
+    if not get_active_business_id(request):
         return JsonResponse({"error": "No business selected"}, status=404)
-    business = get_object_or_404(Business, id=bid)
+    business = get_active_business(request)
+    if business is None:
+        raise Http404("No Business matches the given query.")
     acc = get_object_or_404(Account, id=account_id, business=business, is_group=False)
 
-    qs = VoucherLine.objects.filter(
-        voucher__business=business,
-        voucher__is_posted=True,
-        account=acc,
-    )
-    agg = qs.aggregate(
-        dr=Sum("debit", default=Decimal("0.00")),
-        cr=Sum("credit", default=Decimal("0.00")),
-    )
-    net = (agg["dr"] or Decimal("0.00")) - (agg["cr"] or Decimal("0.00"))
+    # Stored running totals plus the posted lines above their watermark, instead of rescanning all lines
+    dr, cr = LedgerAggregate.balances(business, [acc.id])[acc.id]
+    net = dr - cr
     amt, drcr = _format_drcr(net)
 
     return JsonResponse({
         "account_id": acc.id,
         "amount": amt,
         "drcr": drcr,
-        "net": str(net.quantize(Decimal("0.01"))),
+        "net": str(net.quantize(_Q2)),
     })
 
 
@@ -89,16 +103,18 @@ def gateway(request):
     if redirect_response:
         return redirect_response
     
-    # quick stats
+    # quick stats: account count, and draft/posted counts from one conditional aggregate
     accounts_count = Account.objects.filter(business=business).count()
-    draft_vouchers = Voucher.objects.filter(business=business, is_posted=False).count()
-    posted_vouchers = Voucher.objects.filter(business=business, is_posted=True).count()
+    voucher_counts = Voucher.objects.filter(business=business).aggregate(
+        draft=Count("pk", filter=Q(is_posted=False)),
+        posted=Count("pk", filter=Q(is_posted=True)),
+    )
 
     return render(request, "ledger/gateway.html", {
         "business": business,
         "accounts_count": accounts_count,
-        "draft_vouchers": draft_vouchers,
-        "posted_vouchers": posted_vouchers,
+        "draft_vouchers": voucher_counts["draft"],
+        "posted_vouchers": voucher_counts["posted"],
     })
 
 
@@ -117,7 +133,8 @@ def groups_display(request):
     business, redirect_response = _get_business_or_redirect(request)
     if redirect_response:
         return redirect_response
-    groups = Account.objects.filter(business=business, is_group=True).order_by("name")
+    # The list renders name and links (id) only
+    groups = Account.objects.filter(business=business, is_group=True).only("id", "name").order_by("name")
     return render(request, "ledger/groups_display.html", {
         "business": business,
         "groups": groups,
@@ -148,6 +165,21 @@ def group_create(request):
     })
 
 
+def _save_account_form(form):
+    """
+    Save a validated alter form unless the submission left the account as it was loaded.
+    Account.save() runs full_clean (FK, uniqueness and root-lock lookups) before its UPDATE,
+    all for nothing on an unchanged resubmit. form.initial holds the loaded values; by now
+    form.instance holds the cleaned ones (hidden fields such as root_type re-derived).
+    """
+    instance = form.instance
+    if any(
+        form.initial.get(name) != getattr(instance, instance._meta.get_field(name).attname)
+        for name in form._meta.fields
+    ):
+        form.save()
+
+
 @require_http_methods(["GET", "POST"])
 def group_alter(request, pk: int):
     """Alter an existing Group"""
@@ -157,7 +189,7 @@ def group_alter(request, pk: int):
     group = get_object_or_404(Account, pk=pk, business=business, is_group=True)
     form = AccountForm(request.POST or None, instance=group, business=business, include_root_groups=True)
     if request.method == "POST" and form.is_valid():
-        form.save()
+        _save_account_form(form)
         messages.success(request, "Group updated.")
         return redirect("ledger:groups_display")
     return render(request, "ledger/group_form.html", {
@@ -198,58 +230,45 @@ def group_summary(request, pk: int):
 
     # All ledgers under this group (for aggregation)
     all_ledger_ids = _descendant_ledger_ids(group.id, children_map, account_map)
-    ledgers_list = list(Account.objects.filter(id__in=all_ledger_ids)) if all_ledger_ids else []
 
-    # Aggregate posted voucher lines for those ledgers
-    agg_qs = (
-        VoucherLine.objects.filter(
-            account_id__in=all_ledger_ids,
-            voucher__business=business,
-            voucher__is_posted=True,
-        )
-        .values("account_id")
-        .annotate(total_dr=Sum("debit"), total_cr=Sum("credit"))
-    )
-    agg_by_account = {
-        r["account_id"]: (
-            r["total_dr"] or Decimal("0.00"),
-            r["total_cr"] or Decimal("0.00"),
-        )
-        for r in agg_qs
-    }
+    # Opening balances, plus posted Dr/Cr totals from the stored per-ledger aggregates
+    ledgers = (
+        Account.objects.filter(id__in=all_ledger_ids).values_list("id", "opening_balance", "opening_balance_type")
+    ) if all_ledger_ids else []
+    totals = LedgerAggregate.balances(business, all_ledger_ids) if all_ledger_ids else {}
 
     # Closing balance (dr, cr) per ledger
     closing_by_ledger = {}
-    for ledger in ledgers_list:
-        op_bal = ledger.opening_balance or Decimal("0.00")
-        op_type = ledger.opening_balance_type or "DR"
+    for lid, op_bal, op_type in ledgers:
+        op_bal = op_bal or _ZERO
+        op_type = op_type or "DR"
         opening_net = -op_bal if op_type == "CR" else op_bal
-        total_dr, total_cr = agg_by_account.get(ledger.id, (Decimal("0.00"), Decimal("0.00")))
-        closing_net = opening_net + total_dr - total_cr
-        closing_dr = closing_net if closing_net > 0 else Decimal("0.00")
-        closing_cr = -closing_net if closing_net < 0 else Decimal("0.00")
-        closing_by_ledger[ledger.id] = (closing_dr, closing_cr)
+        total_dr, total_cr = totals[lid]
+        closing_net = (opening_net + total_dr - total_cr).quantize(_Q2)
+        closing_dr = closing_net if closing_net > 0 else _ZERO
+        closing_cr = -closing_net if closing_net < 0 else _ZERO
+        closing_by_ledger[lid] = (closing_dr, closing_cr)
 
     # Direct children (sub-groups and ledgers) in name order
     direct_children = Account.objects.filter(parent=group, business=business).order_by("name")
 
     rows = []
-    grand_dr = Decimal("0.00")
-    grand_cr = Decimal("0.00")
+    grand_dr = _ZERO
+    grand_cr = _ZERO
 
     # Current Assets: first row = Closing Stock → Stock Summary
     if group.name and group.name.strip().lower() == "current assets":
         try:
             from datetime import date
             from ledger.services.stock_valuation import closing_stock_value
-            stock_val = closing_stock_value(business, date.today(), godown=None).quantize(Decimal("0.01"))
+            stock_val = closing_stock_value(business, date.today(), godown=None).quantize(_Q2)
         except Exception:
-            stock_val = Decimal("0.00")
+            stock_val = _ZERO
         rows.append({
             "row_type": "closing_stock",
             "name": "Closing Stock",
             "closing_dr": stock_val,
-            "closing_cr": Decimal("0.00"),
+            "closing_cr": _ZERO,
             "link_url": reverse("inventory:stock_summary"),
         })
         grand_dr += stock_val
@@ -257,17 +276,17 @@ def group_summary(request, pk: int):
     for child in direct_children:
         if child.is_group:
             desc_ids = _descendant_ledger_ids(child.id, children_map, account_map)
-            dr = sum(closing_by_ledger.get(lid, (Decimal("0.00"), Decimal("0.00")))[0] for lid in desc_ids)
-            cr = sum(closing_by_ledger.get(lid, (Decimal("0.00"), Decimal("0.00")))[1] for lid in desc_ids)
+            dr = sum(closing_by_ledger.get(lid, (_ZERO, _ZERO))[0] for lid in desc_ids)
+            cr = sum(closing_by_ledger.get(lid, (_ZERO, _ZERO))[1] for lid in desc_ids)
             rows.append({
                 "row_type": "group",
                 "name": child.name,
-                "closing_dr": dr.quantize(Decimal("0.01")),
-                "closing_cr": cr.quantize(Decimal("0.01")),
+                "closing_dr": dr.quantize(_Q2),
+                "closing_cr": cr.quantize(_Q2),
                 "link_url": reverse("ledger:group_summary", args=[child.id]),
             })
         else:
-            dr, cr = closing_by_ledger.get(child.id, (Decimal("0.00"), Decimal("0.00")))
+            dr, cr = closing_by_ledger.get(child.id, (_ZERO, _ZERO))
             rows.append({
                 "row_type": "ledger",
                 "name": child.name,
@@ -282,8 +301,8 @@ def group_summary(request, pk: int):
         "business": business,
         "group": group,
         "rows": rows,
-        "grand_total_dr": grand_dr.quantize(Decimal("0.01")),
-        "grand_total_cr": grand_cr.quantize(Decimal("0.01")),
+        "grand_total_dr": grand_dr.quantize(_Q2),
+        "grand_total_cr": grand_cr.quantize(_Q2),
     })
 
 
@@ -292,7 +311,8 @@ def ledgers_display(request):
     business, redirect_response = _get_business_or_redirect(request)
     if redirect_response:
         return redirect_response
-    ledgers = Account.objects.filter(business=business, is_group=False).order_by("name")
+    # The list renders name and links (id) only
+    ledgers = Account.objects.filter(business=business, is_group=False).only("id", "name").order_by("name")
     return render(request, "ledger/ledgers_display.html", {
         "business": business,
         "ledgers": ledgers,
@@ -305,14 +325,11 @@ def ledger_create(request):
     business, redirect_response = _get_business_or_redirect(request)
     if redirect_response:
         return redirect_response
-    data = request.POST if request.method == "POST" else None
-    if data is not None:
-        data = data.copy()
-        data["behaves_like_subledger"] = True  # Ledgers are always is_group=False
-    form = AccountForm(data, business=business, include_root_groups=False)
-    # For ledgers, set default: behaves_like_subledger = True (so is_group = False)
-    if not request.POST:
-        form.fields["behaves_like_subledger"].initial = True
+    # Ledgers are always is_group=False: the form forces behaves_like_subledger, no POST copy needed
+    form = AccountForm(
+        request.POST if request.method == "POST" else None,
+        business=business, include_root_groups=False, force_subledger=True,
+    )
     if request.method == "POST" and form.is_valid():
         acc = form.save(commit=False)
         acc.business = business
@@ -327,7 +344,7 @@ def ledger_create(request):
                 "An account with this name already exists for this business. "
                 "Use a different name or alter the existing one under Groups/Ledgers Display.",
             )
-            total_op_dr, total_op_cr = _opening_balance_totals(business)
+            total_op_dr, total_op_cr = _opening_balance_totals_cached(request, business)
             return render(request, "ledger/ledger_form.html", {
                 "business": business,
                 "form": form,
@@ -343,7 +360,7 @@ def ledger_create(request):
                         messages.error(request, f"{field}: {msg}")
             else:
                 messages.error(request, str(e))
-            total_op_dr, total_op_cr = _opening_balance_totals(business)
+            total_op_dr, total_op_cr = _opening_balance_totals_cached(request, business)
             return render(request, "ledger/ledger_form.html", {
                 "business": business,
                 "form": form,
@@ -356,7 +373,7 @@ def ledger_create(request):
         return redirect("ledger:ledgers_display")
     if request.method == "POST":
         messages.error(request, "Could not save ledger. Please fix the errors below.")
-    total_op_dr, total_op_cr = _opening_balance_totals(business)
+    total_op_dr, total_op_cr = _opening_balance_totals_cached(request, business)
     return render(request, "ledger/ledger_form.html", {
         "business": business,
         "form": form,
@@ -374,16 +391,16 @@ def ledger_alter(request, pk: int):
     if redirect_response:
         return redirect_response
     ledger = get_object_or_404(Account, pk=pk, business=business, is_group=False)
-    data = request.POST if request.method == "POST" else None
-    if data is not None:
-        data = data.copy()
-        data["behaves_like_subledger"] = True  # Ledgers stay is_group=False
-    form = AccountForm(data, instance=ledger, business=business, include_root_groups=False)
+    # Ledgers stay is_group=False (forced by the form)
+    form = AccountForm(
+        request.POST if request.method == "POST" else None,
+        instance=ledger, business=business, include_root_groups=False, force_subledger=True,
+    )
     if request.method == "POST" and form.is_valid():
-        form.save()
+        _save_account_form(form)
         messages.success(request, "Ledger updated.")
         return redirect("ledger:ledgers_display")
-    total_op_dr, total_op_cr = _opening_balance_totals(business)
+    total_op_dr, total_op_cr = _opening_balance_totals_cached(request, business)
     return render(request, "ledger/ledger_form.html", {
         "business": business,
         "form": form,
@@ -397,7 +414,7 @@ def ledger_alter(request, pk: int):
 
 def _ledger_balance_before(ledger, business, before_date: date):
     """Net balance (Dr positive) for ledger from opening + all posted lines with posting_date < before_date."""
-    op_bal = ledger.opening_balance or Decimal("0.00")
+    op_bal = ledger.opening_balance or _ZERO
     op_type = ledger.opening_balance_type or "DR"
     opening_net = -op_bal if op_type == "CR" else op_bal
     agg = (
@@ -409,9 +426,9 @@ def _ledger_balance_before(ledger, business, before_date: date):
         )
         .aggregate(dr=Sum("debit", default=Decimal("0")), cr=Sum("credit", default=Decimal("0")))
     )
-    dr = agg["dr"] or Decimal("0.00")
-    cr = agg["cr"] or Decimal("0.00")
-    return (opening_net + dr - cr).quantize(Decimal("0.01"))
+    dr = agg["dr"] or _ZERO
+    cr = agg["cr"] or _ZERO
+    return (opening_net + dr - cr).quantize(_Q2)
 
 
 def ledger_monthly_summary(request, pk: int):
@@ -459,9 +476,9 @@ def ledger_monthly_summary(request, pk: int):
             )
             .aggregate(dr=Sum("debit", default=Decimal("0")), cr=Sum("credit", default=Decimal("0")))
         )
-        total_dr = (agg["dr"] or Decimal("0.00")).quantize(Decimal("0.01"))
-        total_cr = (agg["cr"] or Decimal("0.00")).quantize(Decimal("0.01"))
-        closing_net = (opening_net + total_dr - total_cr).quantize(Decimal("0.01"))
+        total_dr = (agg["dr"] or _ZERO).quantize(_Q2)
+        total_cr = (agg["cr"] or _ZERO).quantize(_Q2)
+        closing_net = (opening_net + total_dr - total_cr).quantize(_Q2)
 
         month_name = MONTH_NAMES[month] if 1 <= month <= 12 else str(month)
         link_url = reverse("ledger:ledger_voucher_details", args=[ledger.id]) + f"?year={year}&month={month}"
@@ -521,21 +538,45 @@ def ledger_voucher_details(request, pk: int):
         )
 
     # All posted voucher lines for this ledger (possibly for one month), ordered by date
+    # Render pass: only the columns the table shows, streamed in chunks rather than held as model lists
     lines = (
         base_qs
         .select_related("voucher")
-        .prefetch_related(
-            Prefetch("voucher__lines", queryset=VoucherLine.objects.select_related("account"))
+        .only(
+            "debit", "credit", "memo", "voucher_id",
+            "voucher__posting_date", "voucher__number", "voucher__narration", "voucher__voucher_type",
         )
         .order_by("voucher__posting_date", "voucher__id", "id")
     )
 
+    # Particulars for Purchase/Sales vouchers with no narration/memo: the selected Purchase/Sales
+    # ledger (dropdown value), looked up for all such vouchers in one query before rendering.
+    # PURCHASE: dropdown is the Dr line (purchase ledger); SALES: dropdown is the Cr line (sales ledger)
+    fallback_vouchers = base_qs.filter(
+        voucher__voucher_type__in=("PURCHASE", "SALES"),
+        voucher__narration="",
+        memo="",
+    ).values("voucher_id")
+    others = (
+        VoucherLine.objects.filter(voucher_id__in=fallback_vouchers)
+        .exclude(account=ledger)
+        .filter(
+            Q(voucher__voucher_type="PURCHASE", debit__gt=0)
+            | Q(voucher__voucher_type="SALES", credit__gt=0)
+        )
+        .order_by("id")
+        .values_list("voucher_id", "account__name")
+    )
+    particulars_map = {}
+    for voucher_id, account_name in others:
+        particulars_map.setdefault(voucher_id, account_name)
+
     # Opening: full ledger opening, or when month filter use balance at start of that month
     if month_filter:
         opening_net = _ledger_balance_before(ledger, business, month_filter)
     else:
-        opening_net = Decimal("0.00")
-        op_bal = ledger.opening_balance or Decimal("0.00")
+        opening_net = _ZERO
+        op_bal = ledger.opening_balance or _ZERO
         op_type = ledger.opening_balance_type or "DR"
         if op_type == "CR":
             opening_net = -op_bal
@@ -543,24 +584,13 @@ def ledger_voucher_details(request, pk: int):
             opening_net = op_bal
 
     # Build transaction rows: Date, Particulars, Vch Type, Vch No., Debit, Credit
+    # Running balance kept in int cents: plain int adds per row, Decimal only for display
     transactions = []
-    running = opening_net
-    for line in lines:
-        running += line.debit - line.credit
-        amt, drcr = _format_drcr(running)
-        # Particulars: for Purchase/Sales vouchers use the selected Purchase/Sales ledger (dropdown value)
-        particulars = line.voucher.narration or line.memo or "-"
-        if particulars == "-" and line.voucher.voucher_type in ("PURCHASE", "SALES"):
-            for other in line.voucher.lines.all():
-                if other.account_id == ledger.id:
-                    continue
-                # PURCHASE: dropdown is the Dr line (purchase ledger); SALES: dropdown is the Cr line (sales ledger)
-                if line.voucher.voucher_type == "PURCHASE" and other.debit > 0:
-                    particulars = other.account.name
-                    break
-                if line.voucher.voucher_type == "SALES" and other.credit > 0:
-                    particulars = other.account.name
-                    break
+    running = to_cents(opening_net)
+    for line in lines.iterator(chunk_size=500):
+        running += to_cents(line.debit) - to_cents(line.credit)
+        amt, drcr = _format_drcr_cents(running)
+        particulars = line.voucher.narration or line.memo or particulars_map.get(line.voucher_id, "-")
         transactions.append({
             "date": line.voucher.posting_date,
             "particulars": particulars,
@@ -573,8 +603,13 @@ def ledger_voucher_details(request, pk: int):
             "running_drcr": drcr,
         })
 
-    total_dr = sum(t["debit"] for t in transactions)
-    total_cr = sum(t["credit"] for t in transactions)
+    # Period totals from the database (same filter as the lines); the loop above only keeps the running column
+    totals = base_qs.aggregate(
+        total_dr=Sum("debit", default=_ZERO),
+        total_cr=Sum("credit", default=_ZERO),
+    )
+    total_dr = totals["total_dr"]
+    total_cr = totals["total_cr"]
     closing_net = opening_net + total_dr - total_cr
 
     opening_amt, opening_drcr = _format_drcr(opening_net)
@@ -607,11 +642,9 @@ def voucher_types_display(request):
     business, redirect_response = _get_business_or_redirect(request)
     if redirect_response:
         return redirect_response
-    from .models import VoucherType
-    voucher_types = [{"value": choice[0], "label": choice[1]} for choice in VoucherType.choices]
     return render(request, "ledger/voucher_types_display.html", {
         "business": business,
-        "voucher_types": voucher_types,
+        "voucher_types": _VTYPE_ITEMS,
     })
 
 
@@ -662,7 +695,7 @@ def account_edit(request, pk: int):
     acc = get_object_or_404(Account, pk=pk, business=business)
     form = AccountForm(request.POST or None, instance=acc, business=business)
     if request.method == "POST" and form.is_valid():
-        form.save()
+        _save_account_form(form)
         messages.success(request, "Account updated.")
         return redirect("ledger:accounts_gateway")
     return render(request, "ledger/account_form.html", {
@@ -676,7 +709,12 @@ def voucher_list(request):
     business, redirect_response = _get_business_or_redirect(request)
     if redirect_response:
         return redirect_response
-    vouchers = Voucher.objects.filter(business=business).order_by("-posting_date", "-id")[:200]
+    # The list shows only these columns and no related rows; skip narration and the rest
+    vouchers = (
+        Voucher.objects.filter(business=business)
+        .only("id", "number", "voucher_type", "posting_date", "is_posted")
+        .order_by("-posting_date", "-id")[:200]
+    )
     return render(request, "ledger/voucher_list.html", {
         "business": business,
         "vouchers": vouchers,
@@ -696,16 +734,19 @@ def voucher_entry(request, vtype: str):
         return redirect_response
 
     vtype = (vtype or "").upper().strip()
-    if vtype not in ("RECEIPT", "PAYMENT", "CONTRA", "SALES", "PURCHASE"):
+    if vtype not in _ENTRY_VTYPES:
         messages.error(request, "Only Receipt, Payment, Contra, Sales and Purchase are enabled.")
         return redirect("ledger:accounts_gateway")
 
     voucher = Voucher(business=business, voucher_type=vtype)
-    header_form = VoucherEntryHeaderForm(request.POST or None, instance=voucher, business=business)
+    header_form = VoucherEntryHeaderForm(request.POST or None, instance=voucher, business=business, vtype=vtype)
     formset = ParticularFormSet(request.POST or None, form_kwargs={"business": business})
+    # Every particulars row and the top account list the same ledgers: read them once for all
+    _limit_line_accounts(formset, business, extra_forms=[header_form])
 
     if request.method == "POST" and header_form.is_valid() and formset.is_valid():
-        particulars = []
+        # Particulars as parallel lists: the total is one sum() over amounts, lines are built by zip()
+        accounts, amounts, memos = [], [], []
         for f in formset:
             cd = getattr(f, "cleaned_data", None)
             if not cd:
@@ -720,13 +761,11 @@ def voucher_entry(request, vtype: str):
             if not acc or not amt:
                 continue
 
-            particulars.append({
-                "account": acc,
-                "amount": amt,
-                "memo": (cd.get("memo") or "").strip(),
-            })
+            accounts.append(acc)
+            amounts.append(amt)
+            memos.append((cd.get("memo") or "").strip())
 
-        if not particulars:
+        if not amounts:
             messages.error(request, "Enter at least one Particulars line with an amount.")
             return render(request, "ledger/voucher_entry.html", {
                 "business": business,
@@ -735,7 +774,7 @@ def voucher_entry(request, vtype: str):
                 "formset": formset,
             })
 
-        total = sum((p["amount"] for p in particulars), Decimal("0.00"))
+        total = sum(amounts, _ZERO)
         top_account = header_form.cleaned_data["account"]
 
         try:
@@ -743,51 +782,32 @@ def voucher_entry(request, vtype: str):
                 v = header_form.save(commit=False)
                 v.business = business
                 v.voucher_type = vtype
-                # Simple numbering (replace later with per-type sequence)
                 if not getattr(v, "number", None):
-                    v.number = str(Voucher.objects.filter(business=business).count() + 1)
+                    v.number = BusinessVoucherSequence.allocate(business)
                 v.save()
 
-                # One auto top line + particulars
-                # CONTRA default = deposit (receipt-style); contra_direction=withdraw = payment-style
-                contra_withdraw = request.POST.get("contra_direction") == "withdraw"
-                receipt_style = vtype in ("RECEIPT", "SALES") or (vtype == "CONTRA" and not contra_withdraw)
-                # PURCHASE is payment-style (top account Cr, particulars Dr)
-
-                if receipt_style:
+                # One auto top line + particulars; direction decided by the header form
+                # (CONTRA default = deposit, receipt-style; PURCHASE is payment-style)
+                if header_form.cleaned_data["receipt_style"]:
                     # Top account receives (Dr), particulars give (Cr) — e.g. deposit to bank
-                    VoucherLine.objects.create(
-                        voucher=v,
-                        account=top_account,
-                        debit=total,
-                        credit=Decimal("0.00"),
-                        memo="",
-                    )
-                    for p in particulars:
-                        VoucherLine.objects.create(
-                            voucher=v,
-                            account=p["account"],
-                            debit=Decimal("0.00"),
-                            credit=p["amount"],
-                            memo=p["memo"],
-                        )
+                    lines = [VoucherLine(voucher=v, account=top_account, debit=total, credit=_ZERO, memo="")]
+                    lines += [
+                        VoucherLine(voucher=v, account=acc, debit=_ZERO, credit=amt, memo=memo)
+                        for acc, amt, memo in zip(accounts, amounts, memos)
+                    ]
                 else:
                     # Top account gives (Cr), particulars receive (Dr) — e.g. payment or contra withdraw
-                    VoucherLine.objects.create(
-                        voucher=v,
-                        account=top_account,
-                        debit=Decimal("0.00"),
-                        credit=total,
-                        memo="",
-                    )
-                    for p in particulars:
-                        VoucherLine.objects.create(
-                            voucher=v,
-                            account=p["account"],
-                            debit=p["amount"],
-                            credit=Decimal("0.00"),
-                            memo=p["memo"],
-                        )
+                    lines = [VoucherLine(voucher=v, account=top_account, debit=_ZERO, credit=total, memo="")]
+                    lines += [
+                        VoucherLine(voucher=v, account=acc, debit=amt, credit=_ZERO, memo=memo)
+                        for acc, amt, memo in zip(accounts, amounts, memos)
+                    ]
+                # bulk_create skips VoucherLine.save(), so run its validation here. The FKs are objects the
+                # forms already loaded and the check constraints are enforced by the database, so both
+                # are left out instead of costing a query per line.
+                for line in lines:
+                    line.full_clean(exclude=["voucher", "account"], validate_constraints=False)
+                VoucherLine.objects.bulk_create(lines, batch_size=500)
 
                 # Tally-like: Accept posts (locks) immediately
                 v.post(user=request.user)
@@ -811,6 +831,42 @@ def voucher_entry(request, vtype: str):
     })
 
 
+def _save_line_formset(formset):
+    """
+    formset.save() for voucher lines in a fixed number of statements: removed lines in one
+    DELETE, edited lines in one bulk UPDATE, new lines in one bulk INSERT.
+    """
+    lines = formset.save(commit=False)
+    removed = [obj.pk for obj in formset.deleted_objects]
+    if removed:
+        VoucherLine.objects.filter(pk__in=removed).delete()
+    # Same validation VoucherLine.save() runs (see voucher_entry for the excluded fields)
+    for line in lines:
+        line.full_clean(exclude=["voucher", "account"], validate_constraints=False)
+    changed = [line for line in lines if line.pk]
+    if changed:
+        VoucherLine.objects.bulk_update(changed, ["account", "debit", "credit", "memo"], batch_size=500)
+    VoucherLine.objects.bulk_create([line for line in lines if not line.pk], batch_size=500)
+
+
+def _limit_line_accounts(formset, business, extra_forms=()):
+    """
+    Restrict every line form's account field (and any extra_forms') to this business's ledgers.
+    The dropdown options are read once (id, name) and shared by all forms, instead of each
+    form's widget re-running the ledger query when it renders; the queryset stays for validation.
+    """
+    ledger_qs = Account.objects.filter(business=business, is_group=False).order_by("name")
+    choices = None
+    for f in [*formset.forms, *extra_forms]:
+        if "account" in f.fields:
+            field = f.fields["account"]
+            field.queryset = ledger_qs
+            if choices is None:
+                choices = [("", field.empty_label)] if field.empty_label is not None else []
+                choices += list(ledger_qs.values_list("id", "name"))
+            field.choices = choices
+
+
 @require_http_methods(["GET", "POST"])
 def voucher_create(request):
     business, redirect_response = _get_business_or_redirect(request)
@@ -821,22 +877,18 @@ def voucher_create(request):
     formset = VoucherLineFormSet(request.POST or None, instance=v)
 
     # Limit account choices to ledger accounts in this business
-    ledger_qs = Account.objects.filter(business=business, is_group=False).order_by("name")
-    for f in formset.forms:
-        if "account" in f.fields:
-            f.fields["account"].queryset = ledger_qs
+    _limit_line_accounts(formset, business)
 
     if request.method == "POST":
         if form.is_valid() and formset.is_valid():
             with transaction.atomic():
                 v = form.save(commit=False)
                 v.business = business
-                # You can generate number later; for now simple:
                 if not getattr(v, "number", None):
-                    v.number = str((Voucher.objects.filter(business=business).count()) + 1)
+                    v.number = BusinessVoucherSequence.allocate(business)
                 v.save()
                 formset.instance = v
-                formset.save()
+                _save_line_formset(formset)
             messages.success(request, "Voucher saved (draft).")
             return redirect("ledger:voucher_detail", pk=v.pk)
 
@@ -853,14 +905,12 @@ def voucher_detail(request, pk: int):
     if redirect_response:
         return redirect_response
     v = get_object_or_404(Voucher, pk=pk, business=business)
-    lines = v.lines.select_related("account").all()
-
-    totals = lines.aggregate(
-        dr=Sum("debit", default=Decimal("0.00")),
-        cr=Sum("credit", default=Decimal("0.00")),
+    # One query for the rows; totals are summed from the rows already in memory
+    lines = list(
+        v.lines.select_related("account").only("debit", "credit", "memo", "account__id", "account__name")
     )
-    dr = totals["dr"] or Decimal("0.00")
-    cr = totals["cr"] or Decimal("0.00")
+    dr = sum((ln.debit for ln in lines), _ZERO)
+    cr = sum((ln.credit for ln in lines), _ZERO)
 
     return render(request, "ledger/voucher_detail.html", {
         "business": business,
@@ -886,16 +936,13 @@ def voucher_edit(request, pk: int):
     form = VoucherForm(request.POST or None, instance=v)
     formset = VoucherLineFormSet(request.POST or None, instance=v)
 
-    ledger_qs = Account.objects.filter(business=business, is_group=False).order_by("name")
-    for f in formset.forms:
-        if "account" in f.fields:
-            f.fields["account"].queryset = ledger_qs
+    _limit_line_accounts(formset, business)
 
     if request.method == "POST":
         if form.is_valid() and formset.is_valid():
             with transaction.atomic():
                 form.save()
-                formset.save()
+                _save_line_formset(formset)
             messages.success(request, "Voucher updated.")
             return redirect("ledger:voucher_detail", pk=v.pk)
 
@@ -953,6 +1000,54 @@ def voucher_delete(request, pk: int):
     return redirect("ledger:accounts_gateway")
 
 
+# Minimal "Tally-ish" COA starter installed by install_coa
+_STARTER_COA = {
+    "Assets": {
+        "Cash-in-Hand": {"Cash": {}},
+        "Bank Accounts": {},
+    },
+    "Liabilities": {
+        "Duties & Taxes": {},
+        "Sundry Creditors": {},
+    },
+    "Income": {
+        "Sales": {},
+    },
+    "Expenses": {
+        "Purchase": {},
+        "Indirect Expenses": {"Rent": {}, "Electricity": {}},
+    },
+}
+
+# Root type mapping
+_STARTER_COA_ROOT_TYPES = {
+    "Assets": "ASSET",
+    "Liabilities": "LIABILITY",
+    "Income": "INCOME",
+    "Expenses": "EXPENSE",
+}
+
+
+def _flatten_coa_levels(coa, root_types):
+    """Tree dict -> [[(name, parent_name, root_type, is_group), ...] per depth]; roots are always groups."""
+    levels = []
+    level = [(None, None, coa)]
+    while level:
+        rows, next_level = [], []
+        for parent_name, root_type, tree_dict in level:
+            for name, children in tree_dict.items():
+                rt = root_types[name] if parent_name is None else root_type
+                rows.append((name, parent_name, rt, parent_name is None or bool(children)))
+                if children:
+                    next_level.append((name, rt, children))
+        levels.append(rows)
+        level = next_level
+    return levels
+
+
+_STARTER_COA_LEVELS = _flatten_coa_levels(_STARTER_COA, _STARTER_COA_ROOT_TYPES)
+
+
 @require_http_methods(["POST"])
 def install_coa(request):
     business, redirect_response = _get_business_or_redirect(request)
@@ -964,75 +1059,27 @@ def install_coa(request):
         messages.error(request, "Accounts already exist for this business.")
         return redirect("ledger:accounts_gateway")
 
-    # Minimal "Tally-ish" COA starter
-    coa = {
-        "Assets": {
-            "Cash-in-Hand": {"Cash": {}},
-            "Bank Accounts": {},
-        },
-        "Liabilities": {
-            "Duties & Taxes": {},
-            "Sundry Creditors": {},
-        },
-        "Income": {
-            "Sales": {},
-        },
-        "Expenses": {
-            "Purchase": {},
-            "Indirect Expenses": {"Rent": {}, "Electricity": {}},
-        },
-    }
-
-    # Root type mapping
-    roots = {
-        "Assets": "ASSET",
-        "Liabilities": "LIABILITY",
-        "Income": "INCOME",
-        "Expenses": "EXPENSE",
-    }
-
-    def create_node(name, parent, root_type):
-        # group if has children else ledger
-        return Account.objects.create(
-            business=business,
-            name=name,
-            parent=parent,
-            is_group=True,  # default, corrected below
-            root_type=root_type,
-            account_type="",
-        )
-
-    def walk(tree_dict, parent=None, root_name=None):
-        for name, children in tree_dict.items():
-            if parent is None:
-                root_type = roots[name]
-                node = Account.objects.create(
-                    business=business,
-                    name=name,
-                    parent=None,
-                    is_group=True,
-                    root_type=root_type,
-                    account_type="",
-                )
-                walk(children, parent=node, root_name=name)
-            else:
-                root_type = roots[root_name]
-                node = Account.objects.create(
+    with transaction.atomic():
+        # One INSERT per tree depth; parents of each level were inserted (and got ids) by the previous one
+        by_name = {}
+        for level in _STARTER_COA_LEVELS:
+            nodes = []
+            for name, parent_name, root_type, is_group in level:
+                node = Account(
                     business=business,
                     name=name,
-                    parent=parent,
-                    is_group=True,  # will change to ledger if leaf
+                    parent=by_name.get(parent_name),
+                    is_group=is_group,
                     root_type=root_type,
                     account_type="",
                 )
-                if children:
-                    walk(children, parent=node, root_name=root_name)
-                else:
-                    node.is_group = False
-                    node.save(update_fields=["is_group"])
-
-    with transaction.atomic():
-        walk(coa)
+                # What Account.save() does per row, minus the per-row lookups: the business and
+                # parents are known to exist and the names are fixed for an empty business
+                node.is_root = parent_name is None and is_group
+                node.full_clean(exclude=["business", "parent"], validate_unique=False, validate_constraints=False)
+                nodes.append(node)
+                by_name[name] = node
+            Account.objects.bulk_create(nodes)
         # Primary ledger (no group): stores current gross profit (Tally-style exception)
         Account.objects.get_or_create(
             business=business,
@@ -4,13 +4,17 @@ from .models import Business, Membership
 
 @login_required
 def select_business(request):
-    memberships = Membership.objects.select_related("business").filter(user=request.user)
-
     if request.method == "POST":
         business_id = request.POST.get("business_id")
-        if memberships.filter(business_id=business_id).exists():
+        if Membership.objects.filter(user=request.user, business_id=business_id).exists():
             request.session["current_business_id"] = int(business_id)
             return redirect("/")  # go to home
         # if not allowed, just reload page (simple MVP)
 
+    # Dropdown needs only the business id/name and the role
+    memberships = (
+        Membership.objects.filter(user=request.user)
+        .select_related("business")
+        .only("role", "business__id", "business__name")
+    )
     return render(request, "org/select_business.html", {"memberships": memberships})
@@ -1,3 +1,18 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from reports.views import _parse_date
+
+
+class ParseDateTest(SimpleTestCase):
+    """_parse_date takes every date form date.fromisoformat does and nothing else."""
+
+    def test_iso_forms(self):
+        for raw in ("2025-01-05", "20250105", " 2025-01-05 ", "2025-W01-7", "2025W017"):
+            self.assertEqual(_parse_date(raw), date.fromisoformat(raw.strip()), raw)
+        self.assertEqual(_parse_date("2025-W02"), date(2025, 1, 6))
+
+    def test_rejected(self):
+        for raw in ("", None, "2025-02-30", "2025-0105", "05/01/2025", "2025-1-5", "abc", "20250105T00"):
+            self.assertIsNone(_parse_date(raw), raw)
@@ -1,30 +1,38 @@
-from decimal import Decimal
+import hashlib
+from decimal import Decimal, InvalidOperation
 from datetime import date
+from functools import lru_cache
+import re
+from urllib.parse import urlencode
 from django.utils import timezone
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.urls import reverse, reverse_lazy
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
 
-from ledger.services.balance_sheet import compute_balance_sheet
-from ledger.services.cash_bank_summary import compute_cash_bank_summary
-from ledger.services.pnl import compute_profit_and_loss
-from ledger.services.stock_valuation import closing_stock_value_per_godown
-from ledger.utils import get_active_business_id
-from org.models import Business
+from config.financial_year import financial_year_label
+from ledger.utils import get_active_business
 
 try:
     from inventory.models import Godown
 except ImportError:
     Godown = None
 
+# Where report views send requests with no (or a deleted) active business
+SELECT_BUSINESS_URL = reverse_lazy("org:select_business")
+
 
 @login_required
 def home(request):
     """Dashboard: current mode, quick actions, and embedded Ledger + Inventory displays."""
-    bid = get_active_business_id(request)
-    if not bid:
-        return redirect(reverse("org:select_business"))
-    business = get_object_or_404(Business, id=bid)
+    business = get_active_business(request)
+    if business is None:
+        return redirect(SELECT_BUSINESS_URL)
 
     from ledger.models import Account
     ledgers = Account.objects.filter(business=business, is_group=False).order_by("name")
@@ -75,50 +83,124 @@ def pnl(request):
     return render(request, "reports/pnl.html")
 
 
+# Shape check so only well-formed but impossible dates (e.g. 2025-02-30) reach the except path.
+# Same date forms date.fromisoformat takes: 2025-01-05, 20250105, 2025-W01, 2025W01, 2025-W01-3, 2025W013
+_ISO_DATE_RE = re.compile(r"\A\d{4}(?:-?\d{2}-?\d{2}|-?W\d{2}(?:-?\d)?)\Z")
+
+
+@lru_cache(maxsize=512)
 def _parse_date(s):
-    """Parse YYYY-MM-DD from GET param; return date or None."""
+    """Parse an ISO date (YYYY-MM-DD etc.) from GET param; return date or None. Memoized: report links repeat the same dates."""
     if not s:
         return None
+    s = s.strip()
+    if not _ISO_DATE_RE.match(s):
+        return None
     try:
-        return date.fromisoformat(s.strip())
-    except (ValueError, TypeError):
+        return date.fromisoformat(s)
+    except ValueError:
+        return None
+
+
+def _today(request):
+    """Local date for this request, read once so the ETag and the report agree across midnight."""
+    if not hasattr(request, "_today"):
+        request._today = timezone.localdate()
+    return request._today
+
+
+def _report_json(data):
+    """?format=json: the report context as JSON (no template); business/godown become {"id", "name"}."""
+    def plain(value):
+        if isinstance(value, Model):
+            return {"id": value.pk, "name": str(value)}
+        if isinstance(value, dict):
+            return {k: plain(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [plain(v) for v in value]
+        return value
+
+    return JsonResponse(plain(data), encoder=DjangoJSONEncoder)
+
+
+def _report_stamp(request, business):
+    """business_data_stamp, read once per request and shared by the ETag and the cached services."""
+    if not hasattr(request, "_report_stamp"):
+        from ledger.services.report_cache import business_data_stamp
+
+        request._report_stamp = business_data_stamp(business)
+    return request._report_stamp
+
+
+def _report_etag(request, *args, **kwargs):
+    """
+    ETag for P&L / Balance Sheet, over everything the page renders: user, business, query
+    string, today and its FY label (base.html header), the business data stamp and, when the
+    page lists godowns, their names (renames don't touch the stamp).
+    No ETag while flash messages are queued: a 304 would neither show nor consume them.
+    """
+    business = get_active_business(request)
+    if business is None:
+        return None
+    # len() loads the storage without marking it used, so the render still shows them
+    if len(messages.get_messages(request)):
         return None
 
+    godowns = ()
+    if Godown and ("godown" in request.GET or "breakdown" in request.GET):
+        godowns = tuple(Godown.objects.filter(business=business).order_by("id").values_list("id", "name"))
+    today = _today(request)
+    raw = repr((
+        request.user.pk,
+        business.pk,
+        business.name,
+        sorted(request.GET.items()),
+        today,
+        financial_year_label(today),
+        _report_stamp(request, business),
+        godowns,
+    ))
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@etag(_report_etag)
 def profit_and_loss(request):
     """Profit & Loss A/c — Inventory-integrated (Tally-style): Sales, Purchases, Opening/Closing Stock, COGS, Gross/Net Profit."""
-    bid = get_active_business_id(request)
-    if not bid:
-        return redirect(reverse("org:select_business"))
-    business = get_object_or_404(Business, id=bid)
+    from ledger.services.pnl import compute_profit_and_loss
+    from ledger.services.stock_valuation import closing_stock_value_per_godown
+
+    business = get_active_business(request)
+    if business is None:
+        return redirect(SELECT_BUSINESS_URL)
 
     debug = request.GET.get("debug") in ("1", "true", "yes")
     start_date = _parse_date(request.GET.get("start_date"))
     end_date = _parse_date(request.GET.get("end_date"))
-    period_end = end_date if end_date else date.today()
+    period_end = end_date or _today(request)
 
     # Godown filter: ?godown=all or omit = all godowns; ?godown=<id> = that godown only
     godown = None
     godown_param = request.GET.get("godown")
     if Godown and godown_param:
-        if str(godown_param).lower() == "all":
+        if godown_param.lower() == "all":
             godown = None
-        else:
+        elif godown_param.isdecimal():
+            # Non-numeric input (e.g. ?godown=abc) is ignored without raising from int()
             try:
-                gid = int(godown_param)
-                godown = Godown.objects.filter(business=business, id=gid).first()
-            except (ValueError, TypeError):
+                godown = Godown.objects.get(business_id=business.pk, id=int(godown_param))
+            except Godown.DoesNotExist:
                 pass
 
     # Override stock from ledger/book value: ?closing_stock=803000 & ?opening_stock=0 to match Tally when inventory valuation differs
     def _parse_decimal_param(name):
         val = request.GET.get(name)
-        if val is None or val == "":
+        if not val:
             return None
         try:
-            return Decimal(str(val).strip())
-        except (ValueError, TypeError, Exception):
+            return Decimal(val.strip())
+        except InvalidOperation:
             return None
 
     opening_stock_override = _parse_decimal_param("opening_stock")
@@ -132,6 +214,8 @@ def profit_and_loss(request):
         godown=godown,
         opening_stock_override=opening_stock_override,
         closing_stock_override=closing_stock_override,
+        today=_today(request),
+        stamp=_report_stamp(request, business),
     )
     data["business"] = business
     data["godown"] = godown
@@ -141,33 +225,46 @@ def profit_and_loss(request):
     data["closing_stock_override"] = closing_stock_override
     data["opening_stock_override"] = opening_stock_override
 
-    # Per-godown closing stock breakdown (so user can pick one and see 803000)
-    if Godown:
-        closing_per_godown, _ = closing_stock_value_per_godown(business, period_end)
+    # Per-godown closing stock breakdown (so user can pick one and see 803000).
+    # The service already loads the godowns it values (id order), so the selector reuses them.
+    # Only valued on request (?breakdown=1) or once a godown has been picked.
+    want_breakdown = request.GET.get("breakdown") in ("1", "true", "yes") or godown_param is not None
+    data["want_breakdown"] = want_breakdown
+    if Godown and want_breakdown:
+        closing_per_godown, _ = closing_stock_value_per_godown(
+            business, period_end, stamp=_report_stamp(request, business)
+        )
         data["closing_stock_per_godown"] = closing_per_godown
-        data["godowns"] = list(Godown.objects.filter(business=business).order_by("id"))
+        data["godowns"] = [g for g, _ in closing_per_godown]
     else:
         data["closing_stock_per_godown"] = []
         data["godowns"] = []
 
     # Query string for "Opening Stock" / "Closing Stock" links to Stock Summary (godown only; period is FY start–today on that page)
-    qs_parts = []
+    params = {}
     if godown:
-        qs_parts.append(f"godown={godown.id}")
-    data["stock_summary_query"] = "?" + "&".join(qs_parts) if qs_parts else ""
+        params["godown"] = godown.id
+    data["stock_summary_query"] = "?" + urlencode(params) if params else ""
 
+    if request.GET.get("format") == "json":
+        return _report_json(data)
     return render(request, "reports/profit_and_loss.html", data)
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@etag(_report_etag)
 def balance_sheet(request):
     """Balance Sheet: Liabilities (left) and Assets (right). Profit & Loss A/c row shows gross profit from P&L. Row names link to Group Summary or P&L."""
-    bid = get_active_business_id(request)
-    if not bid:
-        return redirect(reverse("org:select_business"))
-    business = get_object_or_404(Business, id=bid)
+    from ledger.services.balance_sheet import compute_balance_sheet
+
+    business = get_active_business(request)
+    if business is None:
+        return redirect(SELECT_BUSINESS_URL)
     end_date = _parse_date(request.GET.get("end_date"))
-    data = compute_balance_sheet(business, end_date=end_date)
+    data = compute_balance_sheet(
+        business, end_date=end_date, today=_today(request), stamp=_report_stamp(request, business)
+    )
 
     # Add link_url to each row: groups → Group Summary, Profit & Loss A/c → P&L report
     liability_rows = [
@@ -188,18 +285,21 @@ def balance_sheet(request):
     data["end_date"] = end_date
     data["liability_rows"] = liability_rows
     data["asset_rows"] = asset_rows
+    if request.GET.get("format") == "json":
+        return _report_json(data)
     return render(request, "reports/balance_sheet.html", data)
 
 
 @login_required
 def cash_bank_summary(request):
     """Cash/Bank Summary: closing balance of Cash-in-hand and Bank Accounts groups with ledgers and Grand Total."""
-    bid = get_active_business_id(request)
-    if not bid:
-        return redirect(reverse("org:select_business"))
-    business = get_object_or_404(Business, id=bid)
+    from ledger.services.cash_bank_summary import compute_cash_bank_summary
+
+    business = get_active_business(request)
+    if business is None:
+        return redirect(SELECT_BUSINESS_URL)
     end_date = _parse_date(request.GET.get("end_date"))
-    data = compute_cash_bank_summary(business, end_date=end_date)
+    data = compute_cash_bank_summary(business, end_date=end_date, today=_today(request))
     data["business"] = business
     return render(request, "reports/cash_bank_summary.html", data)
 
@@ -209,10 +309,9 @@ def day_book(request):
     """Day Book: all transactions for a single selected day. Columns: Date, Particulars, Voucher Type, Voucher No, Debit Amt, Credit Amt."""
     from ledger.models import Voucher, VoucherLine
 
-    bid = get_active_business_id(request)
-    if not bid:
-        return redirect(reverse("org:select_business"))
-    business = get_object_or_404(Business, id=bid)
+    business = get_active_business(request)
+    if business is None:
+        return redirect(SELECT_BUSINESS_URL)
 
     report_date = _parse_date(request.GET.get("date"))
     if not report_date:
@@ -223,7 +322,7 @@ def day_book(request):
             .values_list("posting_date", flat=True)
             .first()
         )
-        report_date = last_date or date.today()
+        report_date = last_date or _today(request)
 
     # Financial year in this system starts on 1-Apr each year.
     # Determine the start of the financial year that contains report_date.